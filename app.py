@@ -1,36 +1,47 @@
+import contextlib
+import importlib
 import streamlit as st
-from sidebar_options import Portfolio_Manager, Risk_Analysis, Transaction_History, Ticker_Watchlist, Stock_Research
+from dotenv import load_dotenv
 
-st.sidebar.title('Navigation')
-page = st.sidebar.selectbox('Select Page', ['Portfolio Manager', 'Risk Analysis', 'Transaction History', 'Watchlist', 'Research'])
+# Load .env before importing features so their module-level settings see it
+load_dotenv()
 
-if page == 'Portfolio Manager':
-    try:
-        Portfolio_Manager.show()
-    except KeyError:
-        st.error('Key Error: Invalid Ticker Symbol')
+from features import metrics  # noqa: E402
+from features.profiling import PROFILE_RERUNS, profile_rerun  # noqa: E402
+from features.scheduler import start_quote_scheduler  # noqa: E402
 
-if page == 'Risk Analysis':
-    try:
-        Risk_Analysis.show()
-    except KeyError:
-        st.error('Key Error: Invalid Ticker Symbol')
+start_quote_scheduler()
 
+# Page modules are imported on first selection so a cold start only pays for the page being shown
+PAGES = {
+    'Portfolio Manager': 'sidebar_options.Portfolio_Manager',
+    'Risk Analysis': 'sidebar_options.Risk_Analysis',
+    'Transaction History': 'sidebar_options.Transaction_History',
+    'Watchlist': 'sidebar_options.Ticker_Watchlist',
+    'Research': 'sidebar_options.Stock_Research',
+    'Diagnostics': 'sidebar_options.Diagnostics',
+}
 
-if page == 'Transaction History':
-    try:
-        Transaction_History.show()
-    except KeyError:
-        st.error('Key Error: Invalid Ticker Symbol')
+st.sidebar.title('Navigation')
+page = st.sidebar.selectbox('Select Page', list(PAGES))
+profiling = PROFILE_RERUNS or st.sidebar.toggle(
+    'Profile page reruns', help='Writes a pstats and a collapsed-stack file per rerun to the profiles directory'
+)
 
-if page == 'Watchlist':
-    try:
-        Ticker_Watchlist.show()
-    except KeyError:
-        st.error('Key Error: Invalid Ticker Symbol')
+profile = {}
+try:
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(metrics.page_scope(page))
+        stack.enter_context(metrics.timed('page.rerun'))
+        if profiling:
+            profile = stack.enter_context(profile_rerun(page))
+        importlib.import_module(PAGES[page]).show()
+except KeyError:
+    st.error('Key Error: Invalid Ticker Symbol')
+finally:
+    metrics.export_textfile()
 
-if page == 'Research':
-    try:
-        Stock_Research.show()
-    except KeyError:
-        st.error('Key Error: Invalid Ticker Symbol')
+if profile:
+    with st.expander(f"⏱️ Rerun profile: {profile['seconds']:.2f}s"):
+        st.dataframe(profile['top'], hide_index=True)
+        st.caption('Saved to ' + ', '.join(profile['paths']))
@@ -0,0 +1,130 @@
+"""Synthetic data provider standing in for yfinance, Groq and Finnhub so benchmarks run offline.
+
+Prices are geometric random walks seeded from the ticker symbol, so the same
+ticker always gets the same history. Every fake call sleeps for `latency`
+seconds first to imitate a network round trip. FakeMarket implements the
+features.providers interface and is swapped in with set_provider().
+"""
+import contextlib
+import json
+import time
+import zlib
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from features.ai_stream import FakeStreamClient
+from features.providers import RecordedResponse, set_provider
+from features.sector_cache import SECTORS
+
+EPOCH = pd.Timestamp('2015-01-02')
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+PERIOD_DAYS = {'1d': 1, '5d': 5, '1mo': 30, '3mo': 90, '6mo': 182, '1y': 365, '2y': 730, '5y': 365 * 5}
+
+
+def ticker_seed(ticker):
+    return zlib.crc32(ticker.encode())
+
+
+def synthetic_closes(tickers, start, end=None):
+    """Date x ticker frame of business-day closes between start and end"""
+    end = pd.Timestamp(end or datetime.now()).normalize()
+    dates = pd.bdate_range(EPOCH, end)
+    first = dates.searchsorted(pd.Timestamp(start).tz_localize(None).normalize())
+    closes = np.empty((len(dates), len(tickers)))
+    for i, ticker in enumerate(tickers):
+        rng = np.random.default_rng(ticker_seed(ticker))
+        drift, vol = rng.uniform(-0.0002, 0.0008), rng.uniform(0.008, 0.03)
+        closes[:, i] = rng.uniform(10, 500) * np.exp(np.cumsum(rng.normal(drift, vol, len(dates))))
+    return pd.DataFrame(closes[first:], index=pd.DatetimeIndex(dates[first:], name='Date'), columns=list(tickers))
+
+
+class FakeMarket:
+    """Offline data provider with configurable per-call latency and call counts"""
+
+    name = 'fake'
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = {'download': 0, 'info': 0, 'finnhub': 0, 'groq': 0}
+
+    def _wait(self, kind):
+        self.calls[kind] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def download(self, tickers, start=None, end=None, period=None, **kwargs):
+        """yf.download with group_by='column': (field, ticker) MultiIndex columns"""
+        self._wait('download')
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        if start is None:
+            start = datetime.now() - timedelta(days=PERIOD_DAYS.get(period, 30))
+        end = pd.Timestamp(end) - timedelta(days=1) if end is not None else None
+        closes = synthetic_closes(tickers, start, end)
+        frames = {
+            'Open': closes * 0.995,
+            'High': closes * 1.01,
+            'Low': closes * 0.99,
+            'Close': closes,
+            'Volume': closes * 0 + 1e6,
+        }
+        return pd.concat(frames, axis=1, names=['Price', 'Ticker'])
+
+    def ticker_info(self, symbol):
+        """yf.Ticker(symbol).info stand-in carrying the fields the pages read"""
+        self._wait('info')
+        closes = synthetic_closes([symbol], datetime.now() - timedelta(days=10))[symbol]
+        return {
+            'symbol': symbol,
+            'longName': f'{symbol} Synthetic Corp',
+            'sector': SECTORS[ticker_seed(symbol) % len(SECTORS)],
+            'regularMarketPrice': float(closes.iloc[-1]),
+            'previousClose': float(closes.iloc[-2]),
+            'marketCap': float(closes.iloc[-1]) * 1e9,
+            'trailingPE': 20.0,
+        }
+
+    def finnhub_get(self, url, params):
+        """Finnhub company-news stand-in returning a few articles per day"""
+        self._wait('finnhub')
+        symbol = params['symbol']
+        days = pd.date_range(params['from'], params['to'])
+        articles = [
+            {
+                'id': ticker_seed(f'{symbol}{day:%Y%m%d}{i}'),
+                'datetime': int(day.timestamp()) + i * 3600,
+                'headline': f'{symbol} headline {day:%Y-%m-%d} #{i}',
+                'summary': 'Synthetic article body.',
+                'url': f'https://example.com/{symbol}/{day:%Y%m%d}/{i}',
+                'source': 'Synthetic',
+            }
+            for day in days for i in range(3)
+        ]
+        return RecordedResponse(200, articles)
+
+    def groq_client(self):
+        """Groq client stand-in: sector prompts get a JSON answer, anything else a canned text"""
+        client = FakeStreamClient(delay=0)
+        create = client._create
+
+        def _create(model, messages, stream=False, **params):
+            self._wait('groq')
+            prompt = messages[-1]['content']
+            if 'Tickers:' in prompt:
+                tickers = prompt.split('Tickers:')[1].splitlines()[0].split(',')
+                mapping = {t.strip(): SECTORS[ticker_seed(t.strip()) % len(SECTORS)] for t in tickers}
+                message = SimpleNamespace(content=json.dumps(mapping))
+                return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+            return create(model, messages, stream=stream, **params)
+
+        client.chat.completions.create = _create
+        return client
+
+    @contextlib.contextmanager
+    def installed(self):
+        """Make this fake the process-wide data provider for the duration of the block"""
+        previous = set_provider(self)
+        try:
+            yield self
+        finally:
+            set_provider(previous)
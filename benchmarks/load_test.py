@@ -0,0 +1,115 @@
+"""Drive many simulated Streamlit sessions through the real pages against recorded market data.
+
+Record once with the app running live (DATA_PROVIDER=record), visiting the
+pages you want to test, then replay offline from the directory holding the
+data files and the recordings:
+
+    python benchmarks/load_test.py --sessions 200 --concurrency 16 --latency 0.02 --output load_test.json
+
+Every session starts on the Portfolio Manager and then visits each page in
+--pages. All upstream calls are answered by the replay provider, so runs are
+reproducible and never reach yfinance, Finnhub or Groq.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_PAGES = ['Portfolio Manager', 'Risk Analysis', 'Transaction History', 'Watchlist', 'Research']
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_session(pages, timeout):
+    """One simulated user: returns [(page, seconds, failed)] for every rerun"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=timeout)
+    runs = []
+    start = time.perf_counter()
+    app.run()
+    runs.append(('Portfolio Manager', time.perf_counter() - start, bool(app.exception)))
+    for page in pages:
+        start = time.perf_counter()
+        app.sidebar.selectbox[0].set_value(page).run()
+        runs.append((page, time.perf_counter() - start, bool(app.exception)))
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--pages', nargs='+', default=DEFAULT_PAGES)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds injected into every replayed call')
+    parser.add_argument('--recordings', default='recordings')
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds allowed per rerun')
+    parser.add_argument('--output', default='load_test.json')
+    args = parser.parse_args()
+
+    # Must be set before the app imports features.providers
+    os.environ.update({
+        'DATA_PROVIDER': 'replay',
+        'RECORDINGS_DIR': os.path.abspath(args.recordings),
+        'REPLAY_LATENCY_SECONDS': str(args.latency),
+        'QUOTE_SCHEDULER': '0',
+        'PROFILE_RERUNS': '0',
+    })
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        sessions = list(pool.map(lambda _: run_session(args.pages, args.timeout), range(args.sessions)))
+    elapsed = time.perf_counter() - start
+
+    by_page = {}
+    for page, seconds, failed in (run for session in sessions for run in session):
+        stats = by_page.setdefault(page, {'seconds': [], 'failures': 0})
+        stats['seconds'].append(seconds)
+        stats['failures'] += failed
+
+    results = {}
+    for page, stats in by_page.items():
+        seconds = stats['seconds']
+        results[page] = {
+            'reruns': len(seconds),
+            'failures': stats['failures'],
+            'median_seconds': statistics.median(seconds),
+            'p95_seconds': percentile(seconds, 0.95),
+            'p99_seconds': percentile(seconds, 0.99),
+            'max_seconds': max(seconds),
+        }
+        print(f"{page:<22} p50 {results[page]['median_seconds'] * 1000:8.1f} ms  "
+              f"p95 {results[page]['p95_seconds'] * 1000:8.1f} ms  "
+              f"p99 {results[page]['p99_seconds'] * 1000:8.1f} ms  failures {stats['failures']}")
+
+    total_reruns = sum(r['reruns'] for r in results.values())
+    print(f'{total_reruns} reruns in {elapsed:.1f}s ({total_reruns / elapsed:.1f} reruns/s)')
+
+    report = {
+        'benchmark': 'load_test',
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sessions': args.sessions,
+        'concurrency': args.concurrency,
+        'latency_seconds': args.latency,
+        'elapsed_seconds': elapsed,
+        'reruns_per_second': total_reruns / elapsed,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Cold-start import cost of the app and each page.
+
+Every module is imported in a fresh interpreter so nothing is already cached
+in sys.modules. Run from the project root:
+
+    python benchmarks/startup.py --repeat 5 --output startup_benchmark.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    'streamlit',
+    'sidebar_options.Portfolio_Manager',
+    'sidebar_options.Risk_Analysis',
+    'sidebar_options.Transaction_History',
+    'sidebar_options.Ticker_Watchlist',
+    'sidebar_options.Stock_Research',
+    'sidebar_options.Diagnostics',
+]
+
+SNIPPET = (
+    'import sys, time; t = time.perf_counter(); '
+    'import {module}; '
+    'print(time.perf_counter() - t, len(sys.modules))'
+)
+
+
+def time_import(module):
+    result = subprocess.run(
+        [sys.executable, '-c', SNIPPET.format(module=module)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    seconds, module_count = result.stdout.split()
+    return float(seconds), int(module_count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default='startup_benchmark.json')
+    args = parser.parse_args()
+
+    results = {}
+    for module in MODULES:
+        runs = [time_import(module) for _ in range(args.repeat)]
+        seconds = [s for s, _ in runs]
+        results[module] = {
+            'median_seconds': statistics.median(seconds),
+            'min_seconds': min(seconds),
+            'max_seconds': max(seconds),
+            'modules_loaded': runs[-1][1],
+        }
+        print(f"{module:<40} {results[module]['median_seconds'] * 1000:8.1f} ms")
+
+    report = {
+        'benchmark': 'startup',
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""Offline benchmarks for the risk, watchlist, performance-chart, session-memory and ledger code paths.
+
+Market data comes from benchmarks/fake_market.py instead of the network, and
+every data file is written to a temporary directory. Run from the project root:
+
+    python benchmarks/suite.py --repeat 3 --latency 0.05 --output suite_benchmark.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+from benchmarks.fake_market import FakeMarket, synthetic_closes
+from features import covariance, ledger, risk_analysis
+from features.monte_carlo import monte_carlo_var
+from features.market_cache import get_market_cache
+from features.frames import PORTFOLIO_DTYPES, PRICE_HISTORY_DTYPES, WATCHLIST_DTYPES, compact, frame_bytes
+from features.nav import nav_series, performance_comparison
+from features.price_store import PRICE_DB_FILE
+from sidebar_options.Stock_Research import METRIC_FIELDS, format_metric, research_metrics
+from sidebar_options.Ticker_Watchlist import refresh_watchlist_data
+
+TICKER_COUNTS = [10, 100, 1000, 5000]
+LEDGER_ROWS = [1_000, 10_000, 100_000, 1_000_000]
+# The per-ticker loop over the single-series risk functions is skipped above this size
+SINGLE_SERIES_MAX_TICKERS = 1000
+# Monte Carlo cost grows with paths x assets^2, so larger portfolios are skipped
+MONTE_CARLO_MAX_TICKERS = 500
+MONTE_CARLO_PATHS = 100_000
+
+
+def tickers_for(n):
+    return [f'T{i:04d}' for i in range(n)]
+
+
+def measure(fn, repeat, setup=None):
+    """Median/min/max wall time of fn() over `repeat` runs, calling setup() before each"""
+    seconds = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - start)
+    return {'median_seconds': statistics.median(seconds), 'min_seconds': min(seconds), 'max_seconds': max(seconds)}
+
+
+def reset_caches():
+    get_market_cache().invalidate()
+    for path in (ledger.LEDGER_DB_FILE, PRICE_DB_FILE):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def reset_covariance():
+    reset_caches()
+    covariance._states.clear()
+
+
+def bench_risk(n, repeat):
+    tickers = tickers_for(n)
+    prices = synthetic_closes(tickers + ['SPY'], datetime.now() - timedelta(days=365))
+    market = prices.pop('SPY')
+
+    def single_series():
+        market_returns = risk_analysis.compute_daily_returns(market)
+        for ticker in tickers:
+            series = prices[ticker]
+            returns = risk_analysis.compute_daily_returns(series)
+            risk_analysis.calculate_volatility(returns)
+            risk_analysis.calculate_beta(returns, market_returns)
+            risk_analysis.calculate_max_drawdown(series)
+            risk_analysis.calculate_sharpe_ratio(returns)
+            risk_analysis.calculate_var(returns)
+
+    results = {'risk_table': measure(lambda: risk_analysis.calculate_risk_table(prices, market), repeat)}
+    if n <= SINGLE_SERIES_MAX_TICKERS:
+        results['single_series_loop'] = measure(single_series, repeat)
+    if n <= MONTE_CARLO_MAX_TICKERS:
+        values = pd.Series(1000.0, index=tickers)
+        results['monte_carlo_var'] = measure(lambda: monte_carlo_var(prices, values, paths=MONTE_CARLO_PATHS), repeat)
+        # Cold loads the whole window from the price store; warm only checks for bars after the last one
+        results['covariance_cold'] = measure(lambda: covariance.get_moments(tickers), repeat, setup=reset_covariance)
+        results['covariance_warm'] = measure(lambda: covariance.get_moments(tickers), repeat)
+    return results
+
+
+def bench_watchlist(n, repeat):
+    watchlist = pd.DataFrame({'Ticker': tickers_for(n)}).reindex(columns=[
+        'Ticker', 'Price Now', 'Price 1M Ago', 'Price 3M Ago', 'Price 6M Ago',
+        'Day % Change', '1M % Change', '3M % Change', '6M % Change'
+    ])
+    return {
+        'cold': measure(lambda: refresh_watchlist_data(watchlist), repeat, setup=reset_caches),
+        'warm': measure(lambda: refresh_watchlist_data(watchlist), repeat),
+    }
+
+
+def seed_ledger(tickers, rows, start):
+    """Bulk-insert `rows` synthetic buys and sells spread over tickers and business days"""
+    ledger.ledger_summary()  # creates the schema
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(start, datetime.now() - timedelta(days=1))
+    picks = rng.integers(0, len(tickers), rows)
+    days = np.sort(rng.integers(0, len(dates), rows))
+    types = np.where(rng.random(rows) < 0.8, 'Buy', 'Sell')
+    shares = rng.uniform(1, 10, rows).round(4)
+    records = [
+        (dates[d].strftime('%Y-%m-%d'), kind, tickers[t], float(s), 100.0, float(s) * 100.0, '')
+        for d, kind, t, s in zip(days, types, picks, shares)
+    ]
+    with sqlite3.connect(ledger.LEDGER_DB_FILE) as conn:
+        conn.executemany(
+            'INSERT INTO transactions (date, type, ticker, shares, price, total_value, notes) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)', records
+        )
+
+
+def bench_performance_chart(n, repeat):
+    """nav_series plus the benchmark load and rebasing render_portfolio_manager charts"""
+    tickers = tickers_for(n)
+    start = datetime.now() - timedelta(days=365 * 5)
+
+    def pipeline():
+        return performance_comparison(nav_series(10_000.0), start)
+
+    def cold_setup():
+        reset_caches()
+        seed_ledger(tickers, n * 4, start)
+
+    def clear_nav():
+        with sqlite3.connect(ledger.LEDGER_DB_FILE) as conn:
+            conn.execute('DELETE FROM nav')
+
+    return {
+        'cold': measure(pipeline, repeat, setup=cold_setup),
+        'rebuild_from_stored_prices': measure(pipeline, repeat, setup=clear_nav),
+        'warm': measure(pipeline, repeat),
+    }
+
+
+def csv_round_trip(df):
+    """The frame as a session held it before compaction: straight out of pd.read_csv"""
+    return pd.read_csv(io.StringIO(df.to_csv(index=False)))
+
+
+def bench_session_memory(n):
+    """Deep size in bytes of one session's frames in the old layout and the compact one"""
+    tickers = tickers_for(n)
+    closes = synthetic_closes(tickers, datetime.now() - timedelta(days=200))
+    now, prev = closes.iloc[-1].to_numpy(), closes.iloc[-2].to_numpy()
+    shares = np.random.default_rng(0).uniform(1, 100, n).round(4)
+    portfolio = csv_round_trip(pd.DataFrame({
+        'Ticker': tickers,
+        'Shares': shares,
+        'Share Price ($)': now,
+        'Total Value ($)': shares * now,
+        'Price Change Per Share ($)': now - prev,
+        'Total Change ($)': shares * (now - prev),
+    }))
+    past = {label: closes.iloc[-1 - days].to_numpy() for label, days in (('1M', 21), ('3M', 63), ('6M', 126))}
+    watchlist = csv_round_trip(pd.DataFrame({
+        'Ticker': tickers,
+        'Price Now': now,
+        **{f'Price {label} Ago': price for label, price in past.items()},
+        'Day % Change': (now - prev) / prev * 100,
+        **{f'{label} % Change': (now - price) / price * 100 for label, price in past.items()},
+    }))
+    history = synthetic_closes(['SPY'], datetime.now() - timedelta(days=365 * 5))['SPY']
+    prices = pd.DataFrame({'Date': history.index, 'Close': history.to_numpy()})
+    metrics = research_metrics({field: 1234.5 * (i + 1) for i, field in enumerate(METRIC_FIELDS.values())})
+
+    layouts = {
+        'portfolio_df': (portfolio, compact(portfolio, PORTFOLIO_DTYPES)),
+        'watchlist_df': (watchlist, compact(watchlist, WATCHLIST_DTYPES)),
+        'ticker_prices_df': (prices, compact(prices, PRICE_HISTORY_DTYPES)),
+        # Stock_Research used to keep the formatted strings
+        'metrics_df': (pd.DataFrame([metrics.map(format_metric)]), metrics.to_frame().T),
+    }
+    results = {name: {'before_bytes': frame_bytes(before), 'after_bytes': frame_bytes(after)}
+               for name, (before, after) in layouts.items()}
+    results['total'] = {key: sum(r[key] for r in results.values()) for key in ('before_bytes', 'after_bytes')}
+    return results
+
+
+def bench_transactions(rows, repeat):
+    tickers = tickers_for(500)
+    now = datetime.now()
+    reset_caches()
+    seed_ledger(tickers, rows, now - timedelta(days=365 * 5))
+    month_ago = now - timedelta(days=30)
+    return {
+        'all': measure(lambda: ledger.query_transactions(), repeat),
+        'last_30_days': measure(lambda: ledger.query_transactions(start=month_ago), repeat),
+        'one_ticker': measure(lambda: ledger.query_transactions(ticker=tickers[0]), repeat),
+        'sells_only': measure(lambda: ledger.query_transactions(txn_type='Sell'), repeat),
+        'positions_as_of': measure(lambda: ledger.positions_as_of(month_ago), repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every fake upstream call')
+    parser.add_argument('--tickers', type=int, nargs='+', default=TICKER_COUNTS)
+    parser.add_argument('--rows', type=int, nargs='+', default=LEDGER_ROWS)
+    parser.add_argument('--output', default='suite_benchmark.json')
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+
+    market = FakeMarket(latency=args.latency)
+    results = {'risk': {}, 'watchlist_refresh': {}, 'performance_chart': {}, 'session_memory': {},
+               'transaction_filter': {}}
+    with tempfile.TemporaryDirectory() as workdir, market.installed():
+        os.chdir(workdir)
+        for n in args.tickers:
+            results['risk'][n] = bench_risk(n, args.repeat)
+            results['watchlist_refresh'][n] = bench_watchlist(n, args.repeat)
+            results['performance_chart'][n] = bench_performance_chart(n, args.repeat)
+            results['session_memory'][n] = bench_session_memory(n)
+            print(f"{n:>6} tickers  risk table {results['risk'][n]['risk_table']['median_seconds'] * 1000:9.1f} ms  "
+                  f"watchlist cold {results['watchlist_refresh'][n]['cold']['median_seconds'] * 1000:9.1f} ms  "
+                  f"chart warm {results['performance_chart'][n]['warm']['median_seconds'] * 1000:9.1f} ms  "
+                  f"session {results['session_memory'][n]['total']['before_bytes'] / 1024:9.1f} -> "
+                  f"{results['session_memory'][n]['total']['after_bytes'] / 1024:.1f} KiB")
+        for rows in args.rows:
+            results['transaction_filter'][rows] = bench_transactions(rows, args.repeat)
+            print(f"{rows:>8} rows  filter all "
+                  f"{results['transaction_filter'][rows]['all']['median_seconds'] * 1000:9.1f} ms")
+        os.chdir(ROOT)
+
+    report = {
+        'benchmark': 'suite',
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'repeat': args.repeat,
+        'latency_seconds': args.latency,
+        'upstream_calls': market.calls,
+        'results': results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
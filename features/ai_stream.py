@@ -0,0 +1,90 @@
+import os
+import time
+from types import SimpleNamespace
+import streamlit as st
+from features import metrics
+from features.llm_cache import cache_key, cached_completion, get_cached, put_cached
+
+AI_STREAMING = os.getenv('AI_STREAMING', '1') != '0'
+AI_FAKE_STREAM = os.getenv('AI_FAKE_STREAM', '0') == '1'
+
+
+class FakeStreamClient:
+    """Offline stand-in for the Groq client that streams a canned answer in small chunks"""
+
+    def __init__(self, text=None, chunk_size=8, delay=0.02):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.delay = delay
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _chunks(self, text):
+        for i in range(0, len(text), self.chunk_size):
+            time.sleep(self.delay)
+            delta = SimpleNamespace(content=text[i:i + self.chunk_size])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    def _create(self, model, messages, stream=False, **params):
+        text = self.text or f"Offline analysis placeholder for: {messages[-1]['content'].strip()[:200]}"
+        if stream:
+            return self._chunks(text)
+        message = SimpleNamespace(content=text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def stream_completion(client, model, messages, temperature, **params):
+    """Yield text deltas from a streamed chat completion, closing the HTTP stream if abandoned"""
+    with metrics.timed('groq.stream'):
+        stream = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+            **params
+        )
+        try:
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
+
+
+def _write_stream(chunks):
+    try:
+        return st.write_stream(chunks).strip()
+    finally:
+        chunks.close()
+
+
+def render_ai_response(get_client, model, messages, temperature, **params):
+    """Render an AI answer as it streams in and return the full text.
+
+    get_client builds the Groq client and is only called on a cache miss, so
+    the fake stream and cached answers work without an API key. Cached answers
+    render immediately; empty answers are never cached. If the rerun is interrupted (the user
+    navigates away) Streamlit raises inside write_stream; the generator is
+    closed so the upstream request is cancelled and the partial text is not cached.
+    """
+    if AI_FAKE_STREAM:
+        # Fake answers never touch the response cache
+        return _write_stream(stream_completion(FakeStreamClient(), model, messages, temperature, **params))
+
+    if not AI_STREAMING:
+        answer = cached_completion(get_client, model, messages, temperature, **params)
+        st.markdown(answer)
+        return answer
+
+    key = cache_key(model, messages, temperature, **params)
+    cached = get_cached(key)
+    if cached is not None:
+        st.markdown(cached)
+        return cached
+
+    answer = _write_stream(stream_completion(get_client(), model, messages, temperature, **params))
+    if answer:
+        put_cached(key, answer)
+    return answer
@@ -0,0 +1,6 @@
+from features.providers import get_provider
+
+
+def get_groq_client():
+    """Groq client from the configured data provider, created on first use so pages that never call the AI don't import groq"""
+    return get_provider().groq_client()
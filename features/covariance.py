@@ -0,0 +1,160 @@
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from features.price_store import load_history
+
+COVARIANCE_WINDOWS = {'3M': 63, '6M': 126, '1Y': 252}
+ESTIMATORS = {'ledoit_wolf': 'Ledoit-Wolf shrinkage', 'sample': 'Sample'}
+# Calendar days loaded per trading day of window, plus a buffer for holidays
+CALENDAR_DAYS_PER_BAR = 1.5
+HISTORY_BUFFER_DAYS = 10
+# Full recompute after this many incremental bars to shed floating-point drift
+REBUILD_EVERY = 252
+MAX_CACHED_STATES = 16
+
+
+class RollingCovariance:
+    """Mean vector and co-moment matrix of the last `window` daily log returns, updated per bar.
+
+    The matrix form of the Welford add/remove updates in RollingRisk: each new
+    bar costs O(N^2) instead of recomputing over the whole window.
+    """
+
+    def __init__(self, tickers, window):
+        self.tickers = list(tickers)
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        size = len(self.tickers)
+        self.n = 0
+        self.mean = np.zeros(size)
+        self.comoment = np.zeros((size, size))
+        self.rows = deque()
+        self.last_date = None
+        self.updates = 0
+
+    def _add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.comoment += np.outer(delta, x - self.mean)
+
+    def _remove(self, x):
+        self.n -= 1
+        if self.n == 0:
+            self.mean[:] = 0.0
+            self.comoment[:] = 0.0
+            return
+        delta = x - self.mean
+        self.mean -= delta / self.n
+        self.comoment -= np.outer(x - self.mean, delta)
+
+    def append(self, returns):
+        """Slide the window over new rows of a date x ticker returns frame (dates after last_date)"""
+        for date, x in zip(returns.index, returns[self.tickers].to_numpy(dtype=float)):
+            self.rows.append(x)
+            self._add(x)
+            if len(self.rows) > self.window:
+                self._remove(self.rows.popleft())
+            self.last_date = date
+            self.updates += 1
+
+    def sample(self):
+        return self.comoment / (self.n - 1)
+
+    def ledoit_wolf(self):
+        """Ledoit-Wolf (2004) shrinkage towards a scaled identity; returns (covariance, intensity).
+
+        Matches sklearn.covariance.ledoit_wolf: the target and intensity use
+        the maximum-likelihood covariance of the window, centered on its mean.
+        """
+        size = len(self.tickers)
+        emp = self.comoment / self.n
+        mu = np.trace(emp) / size
+        squared_norms = ((np.asarray(self.rows) - self.mean) ** 2).sum(axis=1)
+        beta = ((squared_norms ** 2).sum() / self.n - (emp ** 2).sum()) / (size * self.n)
+        delta = ((emp - mu * np.eye(size)) ** 2).sum() / size
+        intensity = 0.0 if delta == 0 else min(beta, delta) / delta
+        return (1 - intensity) * emp + intensity * mu * np.eye(size), intensity
+
+
+_lock = threading.Lock()
+# (tickers, window) -> (lock, RollingCovariance), least recently used first
+_states = OrderedDict()
+
+
+def _log_returns(prices):
+    return np.log(prices.ffill()).diff().iloc[1:].dropna()
+
+
+def _state(tickers, window):
+    key = (tickers, window)
+    with _lock:
+        if key not in _states:
+            _states[key] = (threading.Lock(), RollingCovariance(tickers, window))
+        _states.move_to_end(key)
+        while len(_states) > MAX_CACHED_STATES:
+            _states.popitem(last=False)
+        return _states[key]
+
+
+def _refresh(state, end):
+    """Bring the window up to `end`: only bars after last_date are loaded, unless a rebuild is due"""
+    if state.last_date is None or state.updates >= state.window + REBUILD_EVERY:
+        state.reset()
+        days = int(state.window * CALENDAR_DAYS_PER_BAR) + HISTORY_BUFFER_DAYS
+        start = end - timedelta(days=days)
+    else:
+        start = state.last_date - timedelta(days=HISTORY_BUFFER_DAYS)
+
+    prices = load_history(state.tickers, start, end=end).reindex(columns=state.tickers)
+    returns = _log_returns(prices)
+    # Only completed sessions are fed in: bars are never revisited once appended, and today's can still change
+    returns = returns[returns.index < pd.Timestamp(datetime.today()).normalize()]
+    if state.last_date is not None:
+        returns = returns[returns.index > state.last_date]
+    state.append(returns.tail(state.window))
+
+
+def get_moments(tickers, window=COVARIANCE_WINDOWS['1Y'], estimator='ledoit_wolf', end=None):
+    """Daily log-return mean and covariance for tickers over the last `window` completed bars up to `end`.
+
+    The same (ticker set, window) state is shared by every caller and slid
+    forward one bar at a time as sessions close; today's bar is not included. Returns (mean Series,
+    covariance frame, info) where info has 'observations', 'end' and
+    'shrinkage' (0 for the sample estimator).
+    """
+    tickers = tuple(sorted({t.upper() for t in tickers}))
+    end = pd.Timestamp(end or datetime.today()).normalize()
+    lock, state = _state(tickers, window)
+    with lock:
+        if state.last_date is not None and end < state.last_date:
+            # A past window cannot be slid back to; compute it once without caching
+            state = RollingCovariance(tickers, window)
+        _refresh(state, end)
+        if state.n < 2:
+            raise ValueError('Not enough overlapping price history to estimate a covariance matrix')
+        if estimator == 'sample':
+            cov, intensity = state.sample(), 0.0
+        elif estimator == 'ledoit_wolf':
+            cov, intensity = state.ledoit_wolf()
+        else:
+            raise ValueError(f"estimator must be one of {', '.join(ESTIMATORS)}, not {estimator!r}")
+        mean = pd.Series(state.mean.copy(), index=list(tickers))
+        info = {'observations': state.n, 'end': state.last_date, 'shrinkage': intensity}
+    return mean, pd.DataFrame(cov, index=list(tickers), columns=list(tickers)), info
+
+
+def correlation_from_covariance(cov):
+    std = np.sqrt(np.diag(cov.to_numpy()))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = cov.to_numpy() / np.outer(std, std)
+    return pd.DataFrame(corr, index=cov.index, columns=cov.columns)
+
+
+def betas_from_covariance(cov, benchmark):
+    """Beta of every column against the benchmark column, read straight off the matrix"""
+    return (cov[benchmark] / cov.at[benchmark, benchmark]).drop(benchmark).rename('Beta')
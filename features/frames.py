@@ -0,0 +1,56 @@
+"""Compact dtypes for the frames every session keeps in st.session_state.
+
+Tickers are Arrow strings and per-share prices and percentages are Arrow
+float32, instead of Python objects and float64. Share counts and dollar totals
+stay float64 so sums keep cent precision. Frames hold raw numbers only;
+formatting happens when they are rendered.
+"""
+import pandas as pd
+
+TICKER_DTYPE = 'string[pyarrow]'
+PRICE_DTYPE = 'float32[pyarrow]'
+
+PORTFOLIO_DTYPES = {
+    'Ticker': TICKER_DTYPE,
+    'Shares': 'float64',
+    'Share Price ($)': PRICE_DTYPE,
+    'Total Value ($)': 'float64',
+    'Price Change Per Share ($)': PRICE_DTYPE,
+    'Total Change ($)': 'float64',
+}
+WATCHLIST_DTYPES = {
+    'Ticker': TICKER_DTYPE,
+    'Price Now': PRICE_DTYPE,
+    'Price 1M Ago': PRICE_DTYPE,
+    'Price 3M Ago': PRICE_DTYPE,
+    'Price 6M Ago': PRICE_DTYPE,
+    'Day % Change': PRICE_DTYPE,
+    '1M % Change': PRICE_DTYPE,
+    '3M % Change': PRICE_DTYPE,
+    '6M % Change': PRICE_DTYPE,
+}
+PRICE_HISTORY_DTYPES = {'Close': PRICE_DTYPE}
+
+
+def compact(df, dtypes):
+    """Copy of df with the columns named in dtypes cast to them; other columns are left alone.
+
+    Numeric columns are coerced first, since a CSV column that is empty or
+    holds 'N/A' reads back as object.
+    """
+    columns = {c: t for c, t in dtypes.items() if c in df.columns}
+    numeric = {c: pd.to_numeric(df[c], errors='coerce') for c, t in columns.items() if t != TICKER_DTYPE}
+    return df.assign(**numeric).astype(columns)
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def session_memory(state):
+    """Rows and deep size in bytes of every DataFrame held in a session's state, largest first"""
+    rows = [
+        {'Key': key, 'Rows': len(value), 'Bytes': frame_bytes(value)}
+        for key, value in state.items() if isinstance(value, pd.DataFrame)
+    ]
+    return pd.DataFrame(rows, columns=['Key', 'Rows', 'Bytes']).sort_values('Bytes', ascending=False)
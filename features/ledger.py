@@ -0,0 +1,239 @@
+import os
+import sqlite3
+import pandas as pd
+from features import metrics
+
+LEDGER_DB_FILE = 'ledger.db'
+LEGACY_TRANSACTIONS_FILE = 'transactions.csv'
+LEDGER_COLUMNS = ["Date", "Type", "Ticker", "Shares", "Price Per Share", "Total Value", "Notes"]
+_DB_COLUMNS = ['date', 'type', 'ticker', 'shares', 'price', 'total_value', 'notes']
+SNAPSHOT_EVERY = 500
+NAV_COLUMNS = ['Holdings Value', 'Cash', 'Flow', 'NAV', 'Daily Return', 'TWR Index']
+
+
+def _connect():
+    conn = sqlite3.connect(LEDGER_DB_FILE, timeout=30)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS transactions ('
+        'id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL, type TEXT NOT NULL, '
+        'ticker TEXT NOT NULL, shares REAL, price REAL, total_value REAL, notes TEXT)'
+    )
+    conn.execute('CREATE INDEX IF NOT EXISTS transactions_date ON transactions (date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS transactions_ticker ON transactions (ticker, date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS transactions_type ON transactions (type, date)')
+    conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+    conn.execute('CREATE TABLE IF NOT EXISTS snapshots (as_of_date TEXT PRIMARY KEY, created_at TEXT)')
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS snapshot_positions ('
+        'as_of_date TEXT NOT NULL, ticker TEXT NOT NULL, shares REAL NOT NULL, '
+        'PRIMARY KEY (as_of_date, ticker))'
+    )
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS nav ('
+        'date TEXT PRIMARY KEY, holdings_value REAL, cash REAL, flow REAL, '
+        'nav REAL, daily_return REAL, twr_index REAL)'
+    )
+    _migrate_csv(conn)
+    return conn
+
+
+def _migrate_csv(conn):
+    """Import transactions.csv once; the CSV is left in place as a backup"""
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'csv_migrated'").fetchone():
+        return
+    # Take the write lock before re-checking so two sessions cannot import the CSV twice
+    conn.execute('BEGIN IMMEDIATE')
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'csv_migrated'").fetchone():
+        conn.commit()
+        return
+    if os.path.exists(LEGACY_TRANSACTIONS_FILE):
+        df = pd.read_csv(LEGACY_TRANSACTIONS_FILE).reindex(columns=LEDGER_COLUMNS)
+        df = df.dropna(subset=['Date', 'Type', 'Ticker'])
+        df['Date'] = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d')
+        rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        conn.executemany(
+            f'INSERT INTO transactions ({", ".join(_DB_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)', rows
+        )
+    conn.execute("INSERT INTO meta VALUES ('csv_migrated', datetime('now'))")
+    conn.commit()
+
+
+def _invalidate_derived(conn, date):
+    # Snapshots and NAV rows cover every transaction on or before their date, so
+    # any change on or before that date makes them stale
+    conn.execute('DELETE FROM snapshot_positions WHERE as_of_date >= ?', (date,))
+    conn.execute('DELETE FROM snapshots WHERE as_of_date >= ?', (date,))
+    conn.execute('DELETE FROM nav WHERE date >= ?', (date,))
+
+
+def append_transaction(date, txn_type, ticker, shares, price_per_share, total_value, notes=""):
+    with metrics.timed('sqlite.append_transaction'), _connect() as conn:
+        _invalidate_derived(conn, date)
+        cursor = conn.execute(
+            f'INSERT INTO transactions ({", ".join(_DB_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (date, txn_type, ticker, float(shares), float(price_per_share), float(total_value), notes)
+        )
+        return cursor.lastrowid
+
+
+def seed_opening_positions(date, rows, notes):
+    """Insert (ticker, shares, price) rows as opening buys, once and only into an empty ledger.
+
+    A meta flag records that the seed ran, so selling out or deleting the
+    opening buys later does not bring them back.
+    """
+    with metrics.timed('sqlite.seed_opening_positions'), _connect() as conn:
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'positions_seeded'").fetchone():
+            return False
+        conn.execute('BEGIN IMMEDIATE')
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'positions_seeded'").fetchone():
+            return False
+        seeded = not conn.execute('SELECT 1 FROM transactions LIMIT 1').fetchone()
+        if seeded:
+            _invalidate_derived(conn, date)
+            conn.executemany(
+                f'INSERT INTO transactions ({", ".join(_DB_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(date, 'Buy', ticker, float(shares), float(price), float(shares * price), notes)
+                 for ticker, shares, price in rows]
+            )
+        conn.execute("INSERT INTO meta VALUES ('positions_seeded', datetime('now'))")
+        return seeded
+
+
+def query_transactions(start=None, end=None, ticker=None, txn_type=None):
+    """Transactions matching the filters as a frame indexed by transaction id"""
+    clauses, params = [], []
+    if start is not None:
+        clauses.append('date >= ?')
+        params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+    if end is not None:
+        clauses.append('date <= ?')
+        params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+    if ticker is not None:
+        clauses.append('ticker = ?')
+        params.append(ticker)
+    if txn_type is not None:
+        clauses.append('type = ?')
+        params.append(txn_type)
+
+    query = f'SELECT id, {", ".join(_DB_COLUMNS)} FROM transactions'
+    if clauses:
+        query += ' WHERE ' + ' AND '.join(clauses)
+    query += ' ORDER BY date, id'
+
+    with metrics.timed('sqlite.query_transactions'), _connect() as conn:
+        df = pd.read_sql_query(query, conn, params=params, index_col='id')
+    df.columns = LEDGER_COLUMNS
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
+
+
+def ledger_summary():
+    """Date range plus distinct tickers and types, answered from the indexes"""
+    with metrics.timed('sqlite.ledger_summary'), _connect() as conn:
+        min_date, max_date = conn.execute('SELECT MIN(date), MAX(date) FROM transactions').fetchone()
+        tickers = [r[0] for r in conn.execute('SELECT DISTINCT ticker FROM transactions ORDER BY ticker')]
+        types = [r[0] for r in conn.execute('SELECT DISTINCT type FROM transactions ORDER BY type')]
+    if min_date is None:
+        return None
+    return {
+        'min_date': pd.Timestamp(min_date),
+        'max_date': pd.Timestamp(max_date),
+        'tickers': tickers,
+        'types': types,
+    }
+
+
+def delete_transactions(ids):
+    ids = [(int(i),) for i in ids]
+    if not ids:
+        return
+    with metrics.timed('sqlite.delete_transactions'), _connect() as conn:
+        placeholders = ','.join('?' * len(ids))
+        earliest = conn.execute(
+            f'SELECT MIN(date) FROM transactions WHERE id IN ({placeholders})', [i for (i,) in ids]
+        ).fetchone()[0]
+        if earliest is not None:
+            _invalidate_derived(conn, earliest)
+        conn.executemany('DELETE FROM transactions WHERE id = ?', ids)
+
+
+def _position_deltas(conn, after, through):
+    cursor = conn.execute(
+        "SELECT ticker, SUM(CASE WHEN type = 'Sell' THEN -shares ELSE shares END), COUNT(*) "
+        'FROM transactions WHERE date > ? AND date <= ? GROUP BY ticker',
+        (after, through)
+    )
+    deltas, count = {}, 0
+    for ticker, shares, n in cursor:
+        deltas[ticker] = shares or 0.0
+        count += n
+    return deltas, count
+
+
+def _replay(conn, through):
+    """Positions after every transaction on or before `through`: last snapshot plus the delta since"""
+    snapshot_date = conn.execute(
+        'SELECT MAX(as_of_date) FROM snapshots WHERE as_of_date <= ?', (through,)
+    ).fetchone()[0]
+    positions = {}
+    if snapshot_date is not None:
+        positions = dict(conn.execute(
+            'SELECT ticker, shares FROM snapshot_positions WHERE as_of_date = ?', (snapshot_date,)
+        ).fetchall())
+
+    deltas, count = _position_deltas(conn, snapshot_date or '', through)
+    for ticker, shares in deltas.items():
+        positions[ticker] = positions.get(ticker, 0.0) + shares
+    positions = {t: s for t, s in positions.items() if abs(s) > 1e-9}
+    return positions, snapshot_date, count
+
+
+def _materialize_snapshot(conn, as_of_date):
+    positions, _, _ = _replay(conn, as_of_date)
+    conn.execute('INSERT OR REPLACE INTO snapshots VALUES (?, datetime(\'now\'))', (as_of_date,))
+    conn.executemany(
+        'INSERT OR REPLACE INTO snapshot_positions VALUES (?, ?, ?)',
+        [(as_of_date, ticker, shares) for ticker, shares in positions.items()]
+    )
+
+
+def positions_as_of(date=None):
+    """Shares held per ticker after all transactions on or before date (default: all of them).
+
+    Rebuilds cost O(transactions since the last snapshot). When that delta grows
+    past SNAPSHOT_EVERY rows a new snapshot is written at the last transaction
+    date before today, so it is not invalidated by today's trades.
+    """
+    through = '9999-12-31' if date is None else pd.Timestamp(date).strftime('%Y-%m-%d')
+    with metrics.timed('sqlite.positions_as_of'), _connect() as conn:
+        positions, snapshot_date, count = _replay(conn, through)
+        if count >= SNAPSHOT_EVERY:
+            today = pd.Timestamp.today().strftime('%Y-%m-%d')
+            snapshot_through = conn.execute(
+                'SELECT MAX(date) FROM transactions WHERE date > ? AND date <= ? AND date < ?',
+                (snapshot_date or '', through, today)
+            ).fetchone()[0]
+            if snapshot_through is not None:
+                _materialize_snapshot(conn, snapshot_through)
+
+    return pd.Series(positions, name='Shares', dtype=float).sort_index()
+
+
+def read_nav():
+    """The persisted daily NAV series indexed by date"""
+    with metrics.timed('sqlite.read_nav'), _connect() as conn:
+        df = pd.read_sql_query('SELECT * FROM nav ORDER BY date', conn, index_col='date')
+    df.columns = NAV_COLUMNS
+    df.index = pd.to_datetime(df.index)
+    df.index.name = 'Date'
+    return df
+
+
+def save_nav(df):
+    rows = [
+        (date.strftime('%Y-%m-%d'), *map(float, values))
+        for date, values in zip(df.index, df[NAV_COLUMNS].to_numpy())
+    ]
+    with metrics.timed('sqlite.save_nav'), _connect() as conn:
+        conn.executemany('INSERT OR REPLACE INTO nav VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from features import metrics
+
+LLM_CACHE_FILE = 'llm_cache.db'
+LLM_CACHE_MAX_BYTES = 20 * 1024 * 1024
+LLM_CACHE_TTL_SECONDS = None
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def _connect():
+    conn = sqlite3.connect(LLM_CACHE_FILE, timeout=30)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS responses ('
+        'key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, '
+        'created_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+    )
+    conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+    return conn
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def cache_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
+def cache_key(model, messages, temperature, **params):
+    system_prompt = '\n'.join(m['content'] for m in messages if m['role'] == 'system')
+    user_prompt = '\n'.join(m['content'] for m in messages if m['role'] == 'user')
+    payload = json.dumps(
+        {'model': model, 'system': system_prompt, 'user': user_prompt, 'temperature': temperature, **params},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_cached(key, ttl=LLM_CACHE_TTL_SECONDS):
+    now = time.time()
+    with metrics.timed('sqlite.llm_cache_get'), _connect() as conn:
+        row = conn.execute('SELECT response, created_at FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is None or (ttl is not None and now - row[1] > ttl):
+            _count('misses')
+            return None
+        conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+    _count('hits')
+    return row[0]
+
+
+def put_cached(key, response, max_bytes=LLM_CACHE_MAX_BYTES):
+    now = time.time()
+    size = len(response.encode('utf-8'))
+    with metrics.timed('sqlite.llm_cache_put'), _connect() as conn:
+        conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)', (key, response, size, now, now))
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= max_bytes:
+            return
+
+        # Evict least recently used entries until the cache fits again
+        with metrics.timed('sqlite.llm_cache_evict'):
+            evicted = []
+            for old_key, old_size in conn.execute('SELECT key, size FROM responses ORDER BY accessed_at'):
+                if total <= max_bytes or old_key == key:
+                    break
+                evicted.append((old_key,))
+                total -= old_size
+            conn.executemany('DELETE FROM responses WHERE key = ?', evicted)
+    _count('evictions', len(evicted))
+
+
+def cached_completion(get_client, model, messages, temperature, ttl=LLM_CACHE_TTL_SECONDS, **params):
+    """Groq chat completion text, served from the on-disk cache when the same prompt was answered before.
+
+    get_client is only called on a cache miss, so cached answers need no API key.
+    """
+    key = cache_key(model, messages, temperature, **params)
+    cached = get_cached(key, ttl=ttl)
+    if cached is not None:
+        return cached
+
+    with metrics.timed('groq.completion'):
+        response = get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            **params
+        )
+    answer = response.choices[0].message.content.strip()
+    if answer:
+        put_cached(key, answer)
+    return answer
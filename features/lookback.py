@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar, Holiday, GoodFriday, USMartinLutherKingJr, USPresidentsDay,
+    USMemorialDay, USLaborDay, USThanksgivingDay, nearest_workday
+)
+from pandas.tseries.offsets import CustomBusinessDay
+
+LOOKBACK_DAYS = {'1M': 30, '3M': 90, '6M': 182}
+
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    rules = [
+        Holiday('New Years Day', month=1, day=1, observance=nearest_workday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday('Juneteenth', month=6, day=19, start_date='2022-01-01', observance=nearest_workday),
+        Holiday('Independence Day', month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday('Christmas Day', month=12, day=25, observance=nearest_workday),
+    ]
+
+
+TRADING_DAY = CustomBusinessDay(calendar=NYSEHolidayCalendar())
+
+
+def previous_trading_days(dates):
+    """Roll each date back to the closest trading day on or before it"""
+    dates = pd.DatetimeIndex(dates).normalize()
+    return pd.DatetimeIndex([TRADING_DAY.rollback(d) for d in dates])
+
+
+def lookback_prices(closes, asof, lookback_days=LOOKBACK_DAYS):
+    """As-of close for every ticker at each lookback, in one searchsorted pass.
+
+    closes is a date x ticker frame. Returns a ticker x lookback-label frame;
+    a lookback that falls before a ticker's first bar uses that first bar.
+    """
+    labels = list(lookback_days)
+    if closes.empty:
+        return pd.DataFrame(np.nan, index=closes.columns, columns=labels)
+
+    closes = closes.sort_index().ffill().bfill()
+    asof = pd.Timestamp(asof).tz_localize(None).normalize()
+    targets = previous_trading_days([asof - pd.Timedelta(days=lookback_days[label]) for label in labels])
+
+    index = closes.index.tz_localize(None) if closes.index.tz is not None else closes.index
+    positions = np.clip(index.searchsorted(targets, side='right') - 1, 0, None)
+    values = closes.to_numpy(dtype=float)[positions]
+    return pd.DataFrame(values.T, index=closes.columns, columns=labels)
+
+
+def watchlist_metrics(tickers, quotes, closes, asof):
+    """Build watchlist rows for all tickers from a quotes frame and a close-price matrix"""
+    tickers = list(tickers)
+    lookback = lookback_prices(closes.reindex(columns=tickers), asof)
+    price = quotes['price'].reindex(tickers).to_numpy(dtype=float)
+    previous = quotes['previous_close'].reindex(tickers).to_numpy(dtype=float)
+    past = np.column_stack([previous, lookback.to_numpy(dtype=float)])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = (price[:, None] - past) / past * 100
+    pct[~np.isfinite(pct)] = np.nan
+
+    return pd.DataFrame({
+        'Ticker': tickers,
+        'Price Now': price,
+        'Price 1M Ago': lookback['1M'].to_numpy(),
+        'Price 3M Ago': lookback['3M'].to_numpy(),
+        'Price 6M Ago': lookback['6M'].to_numpy(),
+        'Day % Change': pct[:, 0],
+        '1M % Change': pct[:, 1],
+        '3M % Change': pct[:, 2],
+        '6M % Change': pct[:, 3],
+    })
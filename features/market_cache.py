@@ -0,0 +1,96 @@
+import threading
+import time
+from concurrent.futures import Future
+import streamlit as st
+from features import metrics
+
+QUOTE_TTL_SECONDS = 60
+INFO_TTL_SECONDS = 300
+
+
+class SingleFlightCache:
+    """Process-wide TTL cache where concurrent requests for the same key share one fetch.
+
+    get_many() batches every key that is neither cached nor already in flight
+    into a single fetch_many() call; callers that need a key another session
+    is fetching wait on that fetch instead of sending their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._inflight = {}
+
+    def get_many(self, keys, fetch_many, ttl):
+        """Return {key: value}; fetch_many(keys) must return a dict, missing keys cache as None"""
+        now = time.monotonic()
+        values, waiting, owned = {}, {}, {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    values[key] = entry[1]
+                elif key in self._inflight:
+                    waiting[key] = self._inflight[key]
+                else:
+                    owned[key] = self._inflight[key] = Future()
+
+        if owned:
+            try:
+                fetched = fetch_many(list(owned))
+            except BaseException as e:
+                with self._lock:
+                    for key in owned:
+                        del self._inflight[key]
+                for future in owned.values():
+                    future.set_exception(e)
+                raise
+
+            expires = time.monotonic() + ttl
+            with self._lock:
+                for key, future in owned.items():
+                    value = fetched.get(key)
+                    self._entries[key] = (expires, value)
+                    del self._inflight[key]
+                    future.set_result(value)
+                    values[key] = value
+
+        for key, future in waiting.items():
+            values[key] = future.result()
+
+        metrics.increment('market_cache.hit', len(values) - len(owned) - len(waiting))
+        metrics.increment('market_cache.miss', len(owned))
+        metrics.increment('market_cache.shared_fetch', len(waiting))
+        return values
+
+    def peek_many(self, keys):
+        """Cached, unexpired values for keys without ever fetching"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                key: self._entries[key][1] for key in keys
+                if key in self._entries and self._entries[key][0] > now
+            }
+
+    def put_many(self, values, ttl):
+        expires = time.monotonic() + ttl
+        with self._lock:
+            for key, value in values.items():
+                self._entries[key] = (expires, value)
+
+    def get(self, key, fetch, ttl):
+        return self.get_many([key], lambda keys: {keys[0]: fetch()}, ttl)[key]
+
+    def invalidate(self, keys=None):
+        with self._lock:
+            if keys is None:
+                self._entries.clear()
+            else:
+                for key in keys:
+                    self._entries.pop(key, None)
+
+
+@st.cache_resource
+def get_market_cache():
+    """The single cache instance shared by every Streamlit session in this process"""
+    return SingleFlightCache()
@@ -0,0 +1,167 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+import pandas as pd
+
+# Upper bounds in seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TICKER_BUCKETS = ((1, '1'), (10, '2-10'), (100, '11-100'), (1000, '101-1000'))
+PROMETHEUS_PREFIX = 'portfolio_app'
+# When set, app.py rewrites this file after every rerun for a node_exporter textfile collector
+METRICS_TEXTFILE = os.getenv('METRICS_TEXTFILE')
+
+_page = contextvars.ContextVar('page', default='background')
+_lock = threading.Lock()
+# (operation, page, tickers) -> {'count', 'errors', 'sum', 'max', 'buckets'}
+_timings = {}
+# (name, page) -> count
+_counters = {}
+
+
+def ticker_label(count):
+    if count is None:
+        return ''
+    for bound, label in TICKER_BUCKETS:
+        if count <= bound:
+            return label
+    return f'{TICKER_BUCKETS[-1][0]}+'
+
+
+@contextmanager
+def page_scope(page):
+    """Tag every timing and counter recorded inside the block with this page"""
+    token = _page.set(page)
+    try:
+        yield
+    finally:
+        _page.reset(token)
+
+
+def record(operation, seconds, tickers=None, error=False):
+    key = (operation, _page.get(), ticker_label(tickers))
+    with _lock:
+        entry = _timings.get(key)
+        if entry is None:
+            entry = _timings[key] = {'count': 0, 'errors': 0, 'sum': 0.0, 'max': 0.0,
+                                     'buckets': [0] * (len(LATENCY_BUCKETS) + 1)}
+        entry['count'] += 1
+        entry['errors'] += error
+        entry['sum'] += seconds
+        entry['max'] = max(entry['max'], seconds)
+        entry['buckets'][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+
+@contextmanager
+def timed(operation, tickers=None):
+    """Time the block into the latency histogram for operation; exceptions count as errors"""
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        record(operation, time.perf_counter() - start, tickers, error)
+
+
+def increment(name, amount=1):
+    key = (name, _page.get())
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def reset():
+    with _lock:
+        _timings.clear()
+        _counters.clear()
+
+
+def _quantile(buckets, count, q):
+    """Upper bound of the bucket holding the q-th observation"""
+    target, seen = q * count, 0
+    for bound, n in zip(LATENCY_BUCKETS + (float('inf'),), buckets):
+        seen += n
+        if seen >= target:
+            return bound
+    return float('inf')
+
+
+def timings_frame():
+    """One row per (operation, page, tickers) with counts, totals and approximate percentiles"""
+    with _lock:
+        items = [(key, dict(entry, buckets=list(entry['buckets']))) for key, entry in _timings.items()]
+    rows = [
+        {
+            'Operation': operation,
+            'Page': page,
+            'Tickers': tickers,
+            'Calls': entry['count'],
+            'Errors': entry['errors'],
+            'Total (s)': entry['sum'],
+            'Mean (ms)': entry['sum'] / entry['count'] * 1000,
+            'p50 (ms) ≤': min(_quantile(entry['buckets'], entry['count'], 0.5), entry['max']) * 1000,
+            'p95 (ms) ≤': min(_quantile(entry['buckets'], entry['count'], 0.95), entry['max']) * 1000,
+            'Max (ms)': entry['max'] * 1000,
+        }
+        for (operation, page, tickers), entry in items
+    ]
+    columns = ['Operation', 'Page', 'Tickers', 'Calls', 'Errors', 'Total (s)',
+               'Mean (ms)', 'p50 (ms) ≤', 'p95 (ms) ≤', 'Max (ms)']
+    return pd.DataFrame(rows, columns=columns).sort_values('Total (s)', ascending=False, ignore_index=True)
+
+
+def counters_frame():
+    with _lock:
+        rows = [{'Counter': name, 'Page': page, 'Count': count} for (name, page), count in _counters.items()]
+    return pd.DataFrame(rows, columns=['Counter', 'Page', 'Count']).sort_values(['Counter', 'Page'], ignore_index=True)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+
+def prometheus_text():
+    """All timings and counters in the Prometheus text exposition format"""
+    with _lock:
+        timings = [(key, dict(entry, buckets=list(entry['buckets']))) for key, entry in sorted(_timings.items())]
+        counters = sorted(_counters.items())
+
+    seconds = f'{PROMETHEUS_PREFIX}_operation_seconds'
+    errors = f'{PROMETHEUS_PREFIX}_operation_errors_total'
+    lines = [f'# HELP {seconds} Latency of external calls, storage operations and page reruns.',
+             f'# TYPE {seconds} histogram']
+    for (operation, page, tickers), entry in timings:
+        labels = _labels(operation=operation, page=page, tickers=tickers)
+        cumulative = 0
+        for bound, n in zip(LATENCY_BUCKETS + (float('inf'),), entry['buckets']):
+            cumulative += n
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{seconds}_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f'{seconds}_sum{{{labels}}} {entry["sum"]!r}')
+        lines.append(f'{seconds}_count{{{labels}}} {entry["count"]}')
+
+    lines += [f'# HELP {errors} Operations that raised.', f'# TYPE {errors} counter']
+    for (operation, page, tickers), entry in timings:
+        lines.append(f'{errors}{{{_labels(operation=operation, page=page, tickers=tickers)}}} {entry["errors"]}')
+
+    events = f'{PROMETHEUS_PREFIX}_events_total'
+    lines += [f'# HELP {events} Cache hits, misses and other counted events.', f'# TYPE {events} counter']
+    for (name, page), count in counters:
+        lines.append(f'{events}{{{_labels(event=name, page=page)}}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def export_textfile():
+    """Rewrite METRICS_TEXTFILE, if configured, with the current Prometheus text"""
+    if METRICS_TEXTFILE:
+        # Imported here because storage itself records timings through this module
+        from features import storage
+        storage.write_text(METRICS_TEXTFILE, prometheus_text())
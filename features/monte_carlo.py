@@ -0,0 +1,115 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+MC_PATHS = 100_000
+# Paths simulated per batch; a batch holds a few (paths x assets) float64 arrays
+MC_CHUNK_PATHS = 5_000
+MC_WORKERS = int(os.getenv('MC_WORKERS', '0'))
+CONFIDENCE_LEVELS = (0.95, 0.99)
+HORIZONS = (1, 5, 10, 21)
+
+
+def robust_cholesky(cov):
+    """Lower Cholesky factor, clipping tiny or negative eigenvalues first when cov is not positive definite.
+
+    A sample covariance of N assets over fewer than N days is singular, so
+    this is the normal case for large portfolios rather than an edge case.
+    """
+    cov = np.asarray(cov, dtype=float)
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh((cov + cov.T) / 2)
+        floor = max(values.max(), 0.0) * 1e-10 + 1e-16
+        repaired = (vectors * np.clip(values, floor, None)) @ vectors.T
+        return np.linalg.cholesky((repaired + repaired.T) / 2)
+
+
+def _simulate_chunk(seed, paths, mean, factor, weights, horizons):
+    """Portfolio simple returns for `paths` draws at every horizon, as a (paths x horizons) array.
+
+    Daily log returns are N(mean, factor @ factor.T), so an h-day log return
+    is exactly N(h * mean, h * cov) and one set of draws serves all horizons.
+    """
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((paths, len(mean))) @ factor.T
+    out = np.empty((paths, len(horizons)))
+    for j, h in enumerate(horizons):
+        out[:, j] = np.expm1(h * mean + np.sqrt(h) * shocks) @ weights
+    return out
+
+
+def _simulate_chunks(args):
+    seeds, sizes, mean, factor, weights, horizons = args
+    return np.vstack([_simulate_chunk(s, n, mean, factor, weights, horizons) for s, n in zip(seeds, sizes)])
+
+
+def simulate_portfolio_returns(mean, cov, weights, paths=MC_PATHS, horizons=HORIZONS,
+                               chunk_paths=MC_CHUNK_PATHS, workers=MC_WORKERS, seed=0):
+    """Simulated portfolio returns over each horizon, a (paths x horizons) array.
+
+    Draws are generated chunk by chunk so memory stays at a few chunk_paths x
+    assets arrays, and every chunk has its own seed spawned from `seed` so the
+    result is the same for any number of worker processes. workers > 1 spreads
+    the chunks across a process pool.
+    """
+    mean = np.asarray(mean, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    factor = robust_cholesky(cov)
+    sizes = [min(chunk_paths, paths - start) for start in range(0, paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if workers and workers > 1 and len(sizes) > 1:
+        groups = [(seeds[i::workers], sizes[i::workers], mean, factor, weights, horizons) for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_simulate_chunks, [g for g in groups if g[1]]))
+        return np.vstack(parts)
+    return _simulate_chunks((seeds, sizes, mean, factor, weights, horizons))
+
+
+def tail_risk(simulated, horizons=HORIZONS, confidence_levels=CONFIDENCE_LEVELS):
+    """VaR and CVaR of simulated returns, signed like calculate_var (losses are negative).
+
+    Returns a frame indexed by horizon in trading days with 'VaR (95%)',
+    'CVaR (95%)', ... columns; CVaR is the mean return at or below the VaR.
+    """
+    rows = {}
+    for j, h in enumerate(horizons):
+        row = {}
+        for confidence in confidence_levels:
+            var = np.percentile(simulated[:, j], (1 - confidence) * 100)
+            row[f'VaR ({confidence:.0%})'] = var
+            row[f'CVaR ({confidence:.0%})'] = simulated[simulated[:, j] <= var, j].mean()
+        rows[h] = row
+    return pd.DataFrame.from_dict(rows, orient='index').rename_axis('Horizon (days)')
+
+
+def monte_carlo_from_moments(mean, cov, values, paths=MC_PATHS, horizons=HORIZONS,
+                             confidence_levels=CONFIDENCE_LEVELS, chunk_paths=MC_CHUNK_PATHS, workers=MC_WORKERS, seed=0):
+    """Portfolio VaR/CVaR for ticker -> position value, given daily log-return moments.
+
+    mean is a Series and cov a frame indexed by ticker, e.g. from
+    features.covariance.get_moments. Results are fractions of the total value.
+    """
+    values = pd.Series(values, dtype=float)
+    tickers = list(values.index)
+    simulated = simulate_portfolio_returns(
+        mean.reindex(tickers).to_numpy(), cov.loc[tickers, tickers].to_numpy(), (values / values.sum()).to_numpy(),
+        paths=paths, horizons=horizons, chunk_paths=chunk_paths, workers=workers, seed=seed
+    )
+    return tail_risk(simulated, horizons, confidence_levels)
+
+
+def monte_carlo_var(prices, values, **kwargs):
+    """Monte Carlo VaR/CVaR straight from a date x ticker price frame, using the sample covariance.
+
+    Moments come from daily log returns on days where every holding traded.
+    """
+    values = pd.Series(values, dtype=float)
+    tickers = [t for t in values.index if t in prices.columns and prices[t].notna().sum() > 2]
+    log_returns = np.log(prices[tickers].ffill()).diff().dropna()
+    cov = pd.DataFrame(np.cov(log_returns.to_numpy(), rowvar=False, ddof=1).reshape(len(tickers), -1),
+                       index=tickers, columns=tickers)
+    return monte_carlo_from_moments(log_returns.mean(), cov, values[tickers], **kwargs)
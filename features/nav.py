@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from features.ledger import NAV_COLUMNS, ledger_summary, positions_as_of, query_transactions, read_nav, save_nav
+from features.lookback import TRADING_DAY
+from features.price_store import load_history
+
+# Calendar days of closes loaded before a batch so its first day can forward-fill
+PRICE_BUFFER_DAYS = 10
+
+
+def _signed(txns, column):
+    sign = np.where(txns['Type'].eq('Sell'), -1.0, 1.0)
+    return txns[column].astype(float).fillna(0.0).to_numpy() * sign
+
+
+def compute_nav(after, end, cash, previous=None):
+    """Daily NAV rows for the trading days after `after` (exclusive) through `end`.
+
+    Positions come from the ledger as of `after` plus the day-by-day share
+    deltas since, valued at each day's close. Buys and sells are external
+    flows, as is any change in the cash balance since `previous` (the last
+    row before this batch). Returns use the end-of-day flow convention:
+    r_t = (NAV_t - flow_t) / NAV_{t-1} - 1, chained into the TWR index.
+    Trades on non-trading days count towards the next trading day.
+    """
+    first = pd.Timestamp(after) + timedelta(days=1) if after is not None else ledger_summary()['min_date']
+    dates = pd.date_range(first.normalize(), pd.Timestamp(end).normalize(), freq=TRADING_DAY)
+    if dates.empty:
+        return pd.DataFrame(columns=NAV_COLUMNS, index=pd.DatetimeIndex([], name='Date'), dtype=float)
+
+    base = positions_as_of(after) if after is not None else pd.Series(dtype=float)
+    txns = query_transactions(start=first, end=dates[-1])
+    tickers = pd.Index(sorted(set(base.index) | set(txns['Ticker'])))
+
+    rows = dates.searchsorted(txns['Date'])
+    deltas = np.zeros((len(dates), len(tickers)))
+    np.add.at(deltas, (rows, tickers.get_indexer(txns['Ticker'])), _signed(txns, 'Shares'))
+    positions = base.reindex(tickers, fill_value=0.0).to_numpy() + deltas.cumsum(axis=0)
+
+    prices = np.zeros((len(dates), len(tickers)))
+    if len(tickers):
+        closes = load_history(list(tickers), dates[0] - timedelta(days=PRICE_BUFFER_DAYS), end=dates[-1])
+        closes = closes.reindex(columns=tickers)
+        prices = closes.reindex(closes.index.union(dates)).ffill().reindex(dates).fillna(0.0).to_numpy()
+
+    holdings = (positions * prices).sum(axis=1)
+    flows = np.bincount(rows, weights=_signed(txns, 'Total Value'), minlength=len(dates))
+    nav = holdings + cash
+
+    prev_nav = np.concatenate([[previous['NAV'] if previous is not None else 0.0], nav[:-1]])
+    flows[0] += cash - (previous['Cash'] if previous is not None else cash)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.where(prev_nav > 0, (nav - flows) / prev_nav - 1, 0.0)
+    start_index = previous['TWR Index'] if previous is not None else 1.0
+
+    return pd.DataFrame({
+        'Holdings Value': holdings,
+        'Cash': cash,
+        'Flow': flows,
+        'NAV': nav,
+        'Daily Return': returns,
+        'TWR Index': start_index * np.cumprod(1 + returns),
+    }, index=pd.DatetimeIndex(dates, name='Date'))
+
+
+def update_nav(cash):
+    """Extend the persisted series through the last completed trading day and return it.
+
+    Only days that are over get persisted; the ledger drops rows on or after
+    the date of any transaction added or deleted, so they are rebuilt here.
+    """
+    stored = read_nav()
+    if ledger_summary() is None:
+        return stored
+
+    last_complete = TRADING_DAY.rollback(pd.Timestamp.today().normalize() - timedelta(days=1))
+    after = stored.index[-1] if not stored.empty else None
+    if after is None or after < last_complete:
+        new = compute_nav(after, last_complete, cash, stored.iloc[-1] if not stored.empty else None)
+        if not new.empty:
+            save_nav(new)
+            stored = pd.concat([stored, new]) if not stored.empty else new
+    return stored
+
+
+def nav_series(cash):
+    """Persisted NAV history plus a live row for today computed from the latest closes"""
+    stored = update_nav(cash)
+    if ledger_summary() is None:
+        return stored
+    previous = stored.iloc[-1] if not stored.empty else None
+    today = compute_nav(stored.index[-1] if not stored.empty else None, pd.Timestamp.today(), cash, previous)
+    if today.empty:
+        return stored
+    return pd.concat([stored, today]) if not stored.empty else today
+
+
+def performance_comparison(nav, start, benchmark='^GSPC', label='S&P 500'):
+    """Portfolio TWR and a benchmark's closes since start, both rebased to 100.
+
+    The rebase day is the first one both series have, so a portfolio younger
+    than the range starts level with the benchmark. Empty when either series
+    has no points in the range.
+    """
+    twr = nav.loc[nav.index >= start, 'TWR Index']
+    closes = load_history([benchmark], start)[benchmark].dropna()
+    if twr.empty or closes.empty:
+        return pd.DataFrame(columns=['Portfolio', label], index=pd.DatetimeIndex([], name='Date'), dtype=float)
+
+    common_start = max(twr.index[0], closes.index[0])
+    twr = twr[twr.index >= common_start]
+    closes = closes[closes.index >= common_start]
+    return pd.DataFrame({
+        'Portfolio': twr / twr.iloc[0] * 100,
+        label: closes / closes.iloc[0] * 100,
+    }).rename_axis('Date')
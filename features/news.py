@@ -0,0 +1,65 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from features import metrics
+from features.providers import get_provider
+
+FINNHUB_NEWS_URL = 'https://finnhub.io/api/v1/company-news'
+NEWS_TTL_SECONDS = 300
+NEWS_PAGE_SIZE = 10
+# Least recently viewed symbols are dropped beyond this many
+MAX_CACHED_SYMBOLS = 64
+
+_lock = threading.Lock()
+# symbol -> {'from': 'YYYY-MM-DD', 'to': 'YYYY-MM-DD', 'fetched_at': monotonic, 'articles': {id: article}}
+_news_cache = OrderedDict()
+
+
+def _fetch_news(symbol, from_date, to_date):
+    params = {'symbol': symbol, 'from': from_date, 'to': to_date, 'token': os.getenv('FIN_API_KEY')}
+    with metrics.timed('finnhub.company_news', tickers=1):
+        response = get_provider().finnhub_get(FINNHUB_NEWS_URL, params)
+    response.raise_for_status()
+    return {article.get('id') or article['url']: article for article in response.json()}
+
+
+def get_company_news(symbol, days=60):
+    """Articles for symbol over the last `days` days, newest first.
+
+    Results are cached per symbol for NEWS_TTL_SECONDS. After that only the
+    days since the newest cached day are fetched and merged in, and a wider
+    range fetches only the missing older days. Only the MAX_CACHED_SYMBOLS
+    most recently viewed symbols are kept.
+    """
+    symbol = symbol.upper()
+    today = datetime.now().strftime('%Y-%m-%d')
+    from_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+
+    with _lock:
+        entry = _news_cache.get(symbol)
+        entry = dict(entry, articles=dict(entry['articles'])) if entry else None
+
+    if entry is None:
+        entry = {'from': from_date, 'to': today, 'fetched_at': time.monotonic(),
+                 'articles': _fetch_news(symbol, from_date, today)}
+    else:
+        if from_date < entry['from']:
+            entry['articles'].update(_fetch_news(symbol, from_date, entry['from']))
+            entry['from'] = from_date
+        if time.monotonic() - entry['fetched_at'] > NEWS_TTL_SECONDS or entry['to'] < today:
+            # The newest cached day is re-fetched as it may have gained articles
+            entry['articles'].update(_fetch_news(symbol, entry['to'], today))
+            entry['to'] = today
+            entry['fetched_at'] = time.monotonic()
+
+    with _lock:
+        _news_cache[symbol] = entry
+        _news_cache.move_to_end(symbol)
+        while len(_news_cache) > MAX_CACHED_SYMBOLS:
+            _news_cache.popitem(last=False)
+
+    cutoff = datetime.strptime(from_date, '%Y-%m-%d').timestamp()
+    articles = [a for a in entry['articles'].values() if a.get('datetime', 0) >= cutoff]
+    return sorted(articles, key=lambda a: a.get('datetime', 0), reverse=True)
@@ -1,89 +1,155 @@
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 import os
-from dotenv import load_dotenv
-from groq import Groq
 import plotly.express as px
 from datetime import datetime, timedelta
-load_dotenv()
+from features.price_store import load_history
+from features.quotes import fetch_quotes, fetch_info, peek_quotes, load_freshness
+from features.sector_cache import get_sectors
+from features.ledger import append_transaction, positions_as_of, seed_opening_positions
+from features.nav import nav_series, performance_comparison
+from features import metrics, storage
+from features.frames import PORTFOLIO_DTYPES, compact
+from features.clients import get_groq_client
 
 API_KEY = os.getenv("API_KEY")
-CSV_FILE = 'portfolio.csv'
-CASH_FILE = 'cash.csv'
-LAST_REFRESH_FILE = 'last_refresh.txt'
-TRANSACTIONS_FILE = 'transactions.csv'
+PRICE_CACHE_COLUMNS = ['Ticker', 'Share Price ($)', 'Price Change Per Share ($)']
+PORTFOLIO_FORMAT = {
+    'Shares': '{:,.4f}',
+    'Share Price ($)': '{:,.2f}',
+    'Total Value ($)': '{:,.2f}',
+    'Price Change Per Share ($)': '{:,.2f}',
+    'Total Change ($)': '{:,.2f}',
+}
+
+def apply_quotes(df, quotes):
+    """Update the price columns of a portfolio frame in place; returns tickers without a quote"""
+    share_price = df['Ticker'].map(quotes['price'])
+    price_change = share_price - df['Ticker'].map(quotes['previous_close'])
+    shares = df['Shares'].astype(float)
+    found = price_change.notna()
+
+    updated = pd.DataFrame({
+        'Share Price ($)': share_price,
+        'Total Value ($)': shares * share_price,
+        'Price Change Per Share ($)': price_change,
+        'Total Change ($)': price_change * shares
+    })
+    for column in updated.columns:
+        # Whole columns are swapped in rather than written in place, which read-only views refuse
+        df[column] = updated[column].where(found, df[column]).astype(df[column].dtype)
+    return df.loc[~found, 'Ticker'].tolist()
+
+
+def migrate_portfolio_csv():
+    """Seed an empty ledger from share counts an older portfolio.csv kept, as one opening buy per ticker.
+
+    The ledger records that the seed ran and the file is rewritten as a plain
+    price cache, so this happens at most once.
+    """
+    old = storage.read_csv(storage.PORTFOLIO_FILE)
+    if old is None or 'Shares' not in old.columns:
+        return
+    today = datetime.now().strftime("%Y-%m-%d")
+    prices = pd.to_numeric(old.get('Share Price ($)', pd.Series(0.0, index=old.index)), errors='coerce').fillna(0.0)
+    rows = [
+        (str(ticker).upper(), shares, price)
+        for ticker, shares, price in zip(old['Ticker'], pd.to_numeric(old['Shares'], errors='coerce'), prices)
+        if shares > 0
+    ]
+    seed_opening_positions(today, rows, 'Opening balance from portfolio.csv')
+    storage.write_csv(storage.PORTFOLIO_FILE, compact(old.reindex(columns=PRICE_CACHE_COLUMNS), PORTFOLIO_DTYPES))
+
+
+def load_holdings():
+    """Current holdings derived from the transaction ledger, priced from the saved price cache.
+
+    Share counts are never stored outside the ledger, so editing or deleting
+    a transaction is reflected on the next rerun. portfolio.csv only keeps the
+    last known price and daily change per ticker.
+    """
+    migrate_portfolio_csv()
+    positions = positions_as_of()
+    positions = positions[positions.abs() > 1e-9]
+    df = pd.DataFrame({'Ticker': positions.index, 'Shares': positions.values})
+    prices = storage.read_csv(storage.PORTFOLIO_FILE)
+    if prices is not None and set(PRICE_CACHE_COLUMNS) <= set(prices.columns):
+        prices = prices[PRICE_CACHE_COLUMNS].drop_duplicates('Ticker', keep='last')
+        df = df.merge(prices, on='Ticker', how='left')
+    df = df.reindex(columns=list(PORTFOLIO_DTYPES))
+    df['Total Value ($)'] = df['Shares'] * pd.to_numeric(df['Share Price ($)'], errors='coerce')
+    df['Total Change ($)'] = df['Shares'] * pd.to_numeric(df['Price Change Per Share ($)'], errors='coerce')
+    return compact(df, PORTFOLIO_DTYPES)
+
+
+def save_prices(df):
+    """Write the price columns of a holdings frame to the price cache, keeping entries for other tickers"""
+    prices = storage.read_csv(storage.PORTFOLIO_FILE)
+    fresh = df.loc[df['Share Price ($)'].notna(), PRICE_CACHE_COLUMNS]
+    if prices is not None and set(PRICE_CACHE_COLUMNS) <= set(prices.columns):
+        prices = prices.loc[~prices['Ticker'].isin(fresh['Ticker']), PRICE_CACHE_COLUMNS]
+        fresh = pd.concat([prices, fresh], ignore_index=True)
+    storage.write_csv(storage.PORTFOLIO_FILE, compact(fresh, PORTFOLIO_DTYPES))
+
+
+def holdings_as_of(date):
+    """Point-in-time holdings from the ledger, valued at that day's close"""
+    positions = positions_as_of(date)
+    if positions.empty:
+        return pd.DataFrame(columns=['Ticker', 'Shares', 'Close ($)', 'Value ($)'])
+
+    end = pd.Timestamp(date)
+    closes = load_history(positions.index.tolist(), end - timedelta(days=10), end=end).ffill()
+    close = closes.iloc[-1].reindex(positions.index) if not closes.empty else pd.Series(float('nan'), index=positions.index)
+    return pd.DataFrame({
+        'Ticker': positions.index,
+        'Shares': positions.values,
+        'Close ($)': close.values,
+        'Value ($)': (positions * close).values
+    })
+
 
 def render_portfolio_manager():
-    client = Groq(api_key=API_KEY)
 
     def log_transaction(date, txn_type, ticker, shares, price_per_share, total_value, notes=""):
-        new_row = {
-            "Date": date,
-            "Type": txn_type,  
-            "Ticker": ticker,
-            "Shares": shares,
-            "Price Per Share": price_per_share,
-            "Total Value": total_value,
-            "Notes": notes
-        }
-        df = pd.DataFrame([new_row])
-        df.to_csv(TRANSACTIONS_FILE, mode="a", header=not os.path.exists(TRANSACTIONS_FILE), index=False)
+        append_transaction(date, txn_type, ticker, shares, price_per_share, total_value, notes)
 
 
     
     def load_cash():
-        if os.path.exists(CASH_FILE):
-            df_cash = pd.read_csv(CASH_FILE)
-            if not df_cash.empty and 'Cash' in df_cash.columns:
-                return float(df_cash.at[0, 'Cash'])
+        df_cash = storage.read_csv(storage.CASH_FILE)
+        if df_cash is not None and not df_cash.empty and 'Cash' in df_cash.columns:
+            return float(df_cash.at[0, 'Cash'])
         return 0.0
 
     def save_cash(cash_amount):
         df_cash = pd.DataFrame({'Cash': [cash_amount]})
-        df_cash.to_csv(CASH_FILE, index=False)
-
-   
-    def load_last_refresh():
-        if os.path.exists(LAST_REFRESH_FILE):
-            with open(LAST_REFRESH_FILE, 'r') as f:
-                ts_str = f.read().strip()
-                try:
-                    return datetime.strptime(ts_str, '%Y-%m-%d %H:%M:%S')
-                except:
-                    return None
-        return None
-
-    def save_last_refresh(dt):
-        with open(LAST_REFRESH_FILE, 'w') as f:
-            f.write(dt.strftime('%Y-%m-%d %H:%M:%S'))
-
-    # Load portfolio and cash
-    if 'portfolio_df' not in st.session_state:
-        if os.path.exists(CSV_FILE):
-            st.session_state.portfolio_df = pd.read_csv(CSV_FILE)
-        else:
-            st.session_state.portfolio_df = pd.DataFrame(
-                columns=[
-                    'Ticker',
-                    'Shares',
-                    'Share Price ($)',
-                    'Total Value ($)',
-                    'Price Change Per Share ($)',
-                    'Total Change ($)'
-                ]
-            )
-
+        storage.write_csv(storage.CASH_FILE, df_cash)
+
+    def refresh_holdings():
+        # Rebuilt from the ledger on every rerun, then priced with whatever quotes are cached
+        df = load_holdings()
+        apply_quotes(df, peek_quotes(df['Ticker'].tolist()))
+        # Holdings never priced before are fetched once per session, not on every rerun
+        tried = st.session_state.setdefault('price_fetch_tried', set())
+        unpriced = [t for t in df.loc[df['Share Price ($)'].isna(), 'Ticker'] if t not in tried]
+        if unpriced:
+            tried.update(unpriced)
+            apply_quotes(df, fetch_quotes(unpriced))
+            save_prices(df)
+        st.session_state.portfolio_df = df
+
+    def record_price(ticker, share_price, previous_close):
+        # The trade is already in the ledger; rebuild holdings from it and keep the quote just fetched
+        refresh_holdings()
+        df = st.session_state.portfolio_df
+        apply_quotes(df, pd.DataFrame({'price': [share_price], 'previous_close': [previous_close]}, index=[ticker]))
+        save_prices(df)
+
+    refresh_holdings()
     if 'cash' not in st.session_state:
         st.session_state.cash = load_cash()
 
-    if 'sector_data' not in st.session_state:
-        st.session_state.sector_data = {}
-
-    # Initialize last_refresh if not set
-    if 'last_refresh' not in st.session_state:
-        st.session_state.last_refresh = load_last_refresh()
-
     st.title("📈 Portfolio Manager")
 
     # Cash input
@@ -110,42 +176,20 @@ def render_portfolio_manager():
             if ticker == "":
                 st.warning("Please enter a ticker symbol.")
             else:
-                yfinance_ticker = yf.Ticker(ticker)
-                share_price = yfinance_ticker.info.get('regularMarketPrice')
-                previous_close = yfinance_ticker.info.get('previousClose')
+                info = fetch_info(ticker)
+                share_price = info.get('regularMarketPrice')
+                previous_close = info.get('previousClose')
 
                 if share_price is None or previous_close is None:
                     st.warning(f"Could not fetch price data for {ticker}. Try again later.")
                 else:
-                    price_change_per_share = share_price - previous_close
-                    total_price = share_price * float(shares)
-                    total_change = price_change_per_share * float(shares)
-
-                    df = st.session_state.portfolio_df
-                    if ticker in df['Ticker'].values:
-                        idx = df.index[df['Ticker'] == ticker][0]
-                        df.at[idx, 'Shares'] += shares
-                        df.at[idx, 'Share Price ($)'] = share_price
-                        df.at[idx, 'Total Value ($)'] = df.at[idx, 'Shares'] * share_price
-                        df.at[idx, 'Price Change Per Share ($)'] = price_change_per_share
-                        df.at[idx, 'Total Change ($)'] = price_change_per_share * df.at[idx, 'Shares']
-                    else:
-                        new_row = pd.DataFrame({
-                            'Ticker': [ticker],
-                            'Shares': [shares],
-                            'Share Price ($)': [share_price],
-                            'Total Value ($)': [total_price],
-                            'Price Change Per Share ($)': [price_change_per_share],
-                            'Total Change ($)': [total_change]
-                        })
-                        st.session_state.portfolio_df = pd.concat([df, new_row], ignore_index=True)
                     try:
                         log_transaction(datetime.now().strftime("%Y-%m-%d"), "Buy", ticker, shares, share_price,
                                         shares * share_price, notes)
                     except ValueError:
                         st.warning('Value Error: No Transactions Detected.')
 
-                    st.session_state.portfolio_df.to_csv(CSV_FILE, index=False)
+                    record_price(ticker, share_price, previous_close)
                     st.success(f"{ticker} saved to portfolio.")
 
         elif submitted_remove:
@@ -154,44 +198,37 @@ def render_portfolio_manager():
             else:
                 df = st.session_state.portfolio_df
                 if ticker in df['Ticker'].values:
-                    idx = df.index[df['Ticker'] == ticker][0]
-                    current_shares = df.at[idx, 'Shares']
+                    current_shares = df.loc[df['Ticker'] == ticker, 'Shares'].iloc[0]
                     if shares > current_shares:
                         st.warning(f"You are trying to remove more shares ({shares}) than owned ({current_shares}).")
                     else:
-                        yfinance_ticker = yf.Ticker(ticker)
-                        share_price = yfinance_ticker.info.get('regularMarketPrice')
-                        previous_close = yfinance_ticker.info.get('previousClose')
+                        info = fetch_info(ticker)
+                        share_price = info.get('regularMarketPrice')
+                        previous_close = info.get('previousClose')
 
                         if share_price is None or previous_close is None:
                             st.warning(f"Could not fetch price data for {ticker}. Try again later.")
                         else:
-                            new_share_count = current_shares - shares
-                            price_change_per_share = share_price - previous_close
-
-                            if new_share_count == 0:
-                                st.session_state.portfolio_df = df.drop(idx).reset_index(drop=True)
-                                st.success(f"All shares of {ticker} removed from portfolio.")
-                            else:
-                                df.at[idx, 'Shares'] = new_share_count
-                                df.at[idx, 'Share Price ($)'] = share_price
-                                df.at[idx, 'Total Value ($)'] = new_share_count * share_price
-                                df.at[idx, 'Price Change Per Share ($)'] = price_change_per_share
-                                df.at[idx, 'Total Change ($)'] = price_change_per_share * new_share_count
-                                st.session_state.portfolio_df = df
-                                st.success(f"{shares} shares of {ticker} removed.")
                             try:
                                 log_transaction(datetime.now().strftime("%Y-%m-%d"), "Sell", ticker, shares,
                                                 share_price, shares * share_price, notes)
                             except ValueError:
                                 st.warning('Value Error: No Transactions Detected.')
 
-                            st.session_state.portfolio_df.to_csv(CSV_FILE, index=False)
+                            record_price(ticker, share_price, previous_close)
+                            if shares == current_shares:
+                                st.success(f"All shares of {ticker} removed from portfolio.")
+                            else:
+                                st.success(f"{shares} shares of {ticker} removed.")
                 else:
                     st.warning('Ticker not found in portfolio.')
 
     st.subheader("Current Portfolio")
-    st.dataframe(st.session_state.portfolio_df, hide_index=True)
+    st.dataframe(st.session_state.portfolio_df.style.format(PORTFOLIO_FORMAT, na_rep='N/A'), hide_index=True)
+
+    with st.expander("Holdings as of a past date"):
+        as_of = st.date_input("As of", value=datetime.today() - timedelta(days=30), max_value=datetime.today())
+        st.dataframe(holdings_as_of(as_of), hide_index=True)
 
     # Portfolio summary
     df = st.session_state.portfolio_df
@@ -237,47 +274,23 @@ def render_portfolio_manager():
     time_choice = st.selectbox("Select Time Range", list(time_options.keys()), index=1)
     days = time_options[time_choice]
 
-    
-    if not df.empty:
-        tickers = df['Ticker'].tolist()
-        shares = df.set_index('Ticker')['Shares'].to_dict()
-        start_date = datetime.today() - timedelta(days=days)
-
-        portfolio_prices = yf.download(tickers, start=start_date, auto_adjust=True)['Close']
-        if isinstance(portfolio_prices, pd.Series):  
-            portfolio_prices = portfolio_prices.to_frame()
-
-        
-        valid_tickers = [t for t in tickers if t in portfolio_prices.columns and not portfolio_prices[t].isnull().all()]
-        portfolio_prices = portfolio_prices[valid_tickers]
-        shares = {t: shares[t] for t in valid_tickers}
-
-        
-        portfolio_prices = portfolio_prices.fillna(method='ffill')
-
-        
-        portfolio_value = portfolio_prices.multiply([shares[t] for t in portfolio_prices.columns], axis=1).sum(axis=1)
-        portfolio_value = portfolio_value.dropna()
-        portfolio_value = portfolio_value[portfolio_value > 0]
-
-        
-        sp500 = yf.download("^GSPC", start=start_date, auto_adjust=True)['Close'].fillna(method='ffill')
+    # Daily NAV from the ledger, persisted and extended incrementally by features.nav
+    nav = nav_series(st.session_state.cash)
+    if not nav.empty:
+        start_date = pd.Timestamp(datetime.today() - timedelta(days=days)).normalize()
+        comparison_df = performance_comparison(nav, start_date)
 
-        if portfolio_value.empty or pd.isna(portfolio_value.iloc[0]) or portfolio_value.iloc[0] == 0:
-            st.warning("Portfolio price data incomplete or zero on first day; cannot display performance graph.")
+        if comparison_df.empty:
+            st.warning("Not enough price history in this range to display the performance graph.")
         else:
-            portfolio_norm = portfolio_value / portfolio_value.iloc[0] * 100
-            sp500_norm = sp500 / sp500.iloc[0] * 100
-
-            comparison_df = pd.DataFrame({
-                "Date": portfolio_norm.index,
-                "Portfolio": pd.Series(portfolio_norm.values.ravel(), index=portfolio_norm.index),
-                "S&P 500": pd.Series(sp500_norm.values.ravel(), index=sp500_norm.index)
-            })
+            comparison_df = comparison_df.reset_index()
 
             fig = px.line(comparison_df, x="Date", y=["Portfolio", "S&P 500"], labels={"value": "Normalized Value"},
                           title=f"Portfolio vs S&P 500 ({time_choice})")
-            st.plotly_chart(fig)
+            with metrics.timed('render.plotly_chart'):
+                st.plotly_chart(fig)
+            st.caption("Portfolio line is the time-weighted return of holdings plus cash, so buys, sells "
+                       "and cash deposits do not show up as gains or losses.")
     else:
         st.info("Add some stocks to see performance comparison.")
 
@@ -286,35 +299,14 @@ def render_portfolio_manager():
         ticker_value_dict = {row['Ticker']: row['Total Value ($)'] for _, row in df.iterrows()}
 
         
-        for ticker in ticker_value_dict:
-            if ticker not in st.session_state.sector_data:
-                prompt = (
-                    f"Classify the company with ticker {ticker} into exactly one of these sectors: "
-                    "Technology, Healthcare, Financials, Consumer Discretionary, Consumer Staples, "
-                    "Energy, Industrials, Materials, Utilities, Real Estate, Communication Services. "
-                    "Respond with only the sector name, nothing else."
-                )
-                try:
-                    # noinspection PyTypeChecker
-                    completion = client.chat.completions.create(
-                        model="llama3-8b-8192",
-                        messages=[
-                            {"role": "system",
-                             "content": "You are a financial assistant that classifies companies into one of the provided sectors."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        temperature=0
-                    )
-                    category = completion.choices[0].message.content.strip()
-                    st.session_state.sector_data[ticker] = category
-                except Exception as e:
-                    st.warning(f"Groq error for {ticker}: {e}")
-
+        sector_data, sector_error = get_sectors(list(ticker_value_dict), get_groq_client if API_KEY else None)
+        if sector_error is not None:
+            st.warning(f"Groq error while classifying sectors: {sector_error}")
 
         
         sector_totals = {}
         for ticker, value in ticker_value_dict.items():
-            sector = st.session_state.sector_data.get(ticker, "Other")
+            sector = sector_data.get(ticker, "Other")
             sector_totals[sector] = sector_totals.get(sector, 0) + value
 
         
@@ -328,42 +320,30 @@ def render_portfolio_manager():
         st.subheader("Portfolio Allocation by Sector")
         if not sector_df.empty:
             fig = px.pie(sector_df, values="Value", names="Sector", title="Sector Allocation")
-            st.plotly_chart(fig)
+            with metrics.timed('render.plotly_chart'):
+                st.plotly_chart(fig)
 
     
     col1, col2 = st.columns([1, 3])
     with col1:
         if st.button("Refresh Price Data"):
-            for i, row in df.iterrows():
-                ticker = row['Ticker']
-                try:
-                    yfinance_ticker = yf.Ticker(ticker)
-                    share_price = yfinance_ticker.info.get('regularMarketPrice')
-                    previous_close = yfinance_ticker.info.get('previousClose')
-
-                    if share_price is not None and previous_close is not None:
-                        share_price = float(share_price)
-                        previous_close = float(previous_close)
-                        shares = float(df.at[i, 'Shares'])
-
-                        df.at[i, 'Share Price ($)'] = share_price
-                        df.at[i, 'Total Value ($)'] = shares * share_price
-                        df.at[i, 'Price Change Per Share ($)'] = share_price - previous_close
-                        df.at[i, 'Total Change ($)'] = (share_price - previous_close) * shares
-                except Exception as e:
-                    st.warning(f"Error updating {ticker}: {e}")
-
-            st.session_state.portfolio_df = df
-            df.to_csv(CSV_FILE, index=False)
-            st.session_state.last_refresh = datetime.now()
-            save_last_refresh(st.session_state.last_refresh)
+            missing = apply_quotes(df, fetch_quotes(df['Ticker'].tolist()))
+            if missing:
+                st.warning(f"Could not fetch price data for {', '.join(missing)}.")
+
+            save_prices(df)
             st.success("Price data refreshed and saved.")
             st.rerun()
 
     with col2:
-        if st.session_state.last_refresh:
-            st.markdown(f"**Last refreshed:** {st.session_state.last_refresh.strftime('%Y-%m-%d %H:%M:%S')}")
-        else:
+        freshness = load_freshness()
+        stamps = [freshness[t] for t in df['Ticker'] if t in freshness]
+        if not stamps:
             st.markdown("**Last refreshed:** Never")
+        elif min(stamps) == max(stamps):
+            st.markdown(f"**Last refreshed:** {max(stamps).strftime('%Y-%m-%d %H:%M:%S')}")
+        else:
+            st.markdown(f"**Last refreshed:** {max(stamps).strftime('%Y-%m-%d %H:%M:%S')} "
+                        f"(oldest holding: {min(stamps).strftime('%Y-%m-%d %H:%M:%S')})")
 
 
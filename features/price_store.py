@@ -0,0 +1,225 @@
+import sqlite3
+from datetime import datetime, timedelta
+import pandas as pd
+from features.market_cache import get_market_cache
+from features import metrics
+from features.providers import get_provider
+
+PRICE_DB_FILE = 'price_history.db'
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# The newest stored bar is re-fetched at most this often, so reruns during the
+# trading day read from disk instead of going back to Yahoo on every widget change.
+TAIL_REFRESH_MINUTES = 15
+# A tail fetch also re-downloads this many days of completed bars, which are
+# compared with the stored ones to spot a split or dividend restatement
+TAIL_OVERLAP_DAYS = 7
+# Relative close difference beyond which the stored series is treated as restated
+RESTATEMENT_TOLERANCE = 1e-4
+# Tables in this database derived from a ticker's closes (owned by features.rolling_risk);
+# their rows for a restated ticker are dropped along with its bars
+DERIVED_TABLES = ('rolling_state', 'rolling_metrics')
+
+
+def _connect():
+    conn = sqlite3.connect(PRICE_DB_FILE, timeout=30)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS bars ('
+        'ticker TEXT NOT NULL, date TEXT NOT NULL, '
+        'open REAL, high REAL, low REAL, close REAL, volume REAL, '
+        'PRIMARY KEY (ticker, date))'
+    )
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS coverage ('
+        'ticker TEXT PRIMARY KEY, first_date TEXT, last_date TEXT, fetched_at TEXT)'
+    )
+    return conn
+
+
+def _download(tickers, start, end=None):
+    """Download adjusted OHLCV bars and split them into one frame per ticker"""
+    with metrics.timed('yfinance.history', tickers=len(tickers)):
+        data = get_provider().download(tickers, start=start, end=end, auto_adjust=True,
+                                       group_by='column', progress=False)
+    bars = {}
+    if data is None or data.empty:
+        return bars
+
+    for ticker in tickers:
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker not in data.columns.get_level_values(1):
+                continue
+            frame = data.xs(ticker, axis=1, level=1)
+        else:
+            frame = data
+        frame = frame.reindex(columns=FIELDS).dropna(subset=['Close'])
+        if not frame.empty:
+            bars[ticker] = frame
+    return bars
+
+
+def _save_bars(conn, ticker, frame):
+    rows = [
+        (ticker, idx.strftime('%Y-%m-%d'), *(None if pd.isna(v) else float(v) for v in values))
+        for idx, values in zip(frame.index, frame[FIELDS].itertuples(index=False, name=None))
+    ]
+    with metrics.timed('sqlite.save_bars'):
+        conn.executemany('INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+
+def _load_coverage(conn, tickers):
+    placeholders = ','.join('?' * len(tickers))
+    with metrics.timed('sqlite.load_coverage', tickers=len(tickers)):
+        cursor = conn.execute(
+            f'SELECT ticker, first_date, last_date, fetched_at FROM coverage WHERE ticker IN ({placeholders})',
+            tickers
+        )
+        return {row[0]: row[1:] for row in cursor.fetchall()}
+
+
+def _plan_fetches(tickers, coverage, start, now):
+    """Group tickers by the window that is missing from disk so each group is one download"""
+    fetches = {}
+    start_str = start.strftime('%Y-%m-%d')
+    stale_before = (now - timedelta(minutes=TAIL_REFRESH_MINUTES)).strftime('%Y-%m-%d %H:%M:%S')
+
+    for ticker in tickers:
+        if ticker not in coverage:
+            fetches.setdefault(start_str, []).append(ticker)
+            continue
+
+        first_date, last_date, fetched_at = coverage[ticker]
+        if start_str < first_date:
+            # Missing head: fetch everything from the new start, the overlap is cheap
+            fetches.setdefault(start_str, []).append(ticker)
+        elif fetched_at < stale_before:
+            # Missing tail: re-fetch the last stored bar as it may have been intraday, plus a few
+            # completed bars to check against what is stored
+            overlap_start = (datetime.strptime(last_date, '%Y-%m-%d') - timedelta(days=TAIL_OVERLAP_DAYS))
+            fetches.setdefault(max(first_date, overlap_start.strftime('%Y-%m-%d')), []).append(ticker)
+    return fetches
+
+
+def _restated(conn, ticker, frame, last_date):
+    """True when downloaded closes before last_date disagree with the stored ones.
+
+    Yahoo re-adjusts the whole history after a split or dividend, so appending
+    a new tail to the old bars would mix two price bases. The last stored bar
+    is skipped since it may have been intraday.
+    """
+    with metrics.timed('sqlite.check_restated'):
+        stored = pd.read_sql_query(
+            'SELECT date, close FROM bars WHERE ticker = ? AND date >= ? AND date < ?', conn,
+            params=[ticker, frame.index.min().strftime('%Y-%m-%d'), last_date]
+        )
+    if stored.empty:
+        return False
+    stored = stored.set_index(pd.to_datetime(stored['date']))['close']
+    fresh = frame['Close'].reindex(stored.index)
+    change = ((fresh - stored).abs() / stored.abs()).dropna()
+    return bool((change > RESTATEMENT_TOLERANCE).any())
+
+
+def _drop_restated(conn, ticker):
+    """Delete a ticker's bars, coverage and anything computed from them in the old price basis"""
+    with metrics.timed('sqlite.drop_restated'):
+        conn.execute('DELETE FROM bars WHERE ticker = ?', (ticker,))
+        conn.execute('DELETE FROM coverage WHERE ticker = ?', (ticker,))
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table in DERIVED_TABLES:
+            if table in existing:
+                # The ticker may also be the benchmark of other tickers' windows
+                conn.execute(f'DELETE FROM {table} WHERE ticker = ? OR benchmark = ?', (ticker, ticker))
+
+
+def _save_coverage(conn, ticker, fetch_start, bars, old, now):
+    first_date = min(fetch_start, old[0]) if old else fetch_start
+    last_date = bars[ticker].index.max().strftime('%Y-%m-%d') if ticker in bars else fetch_start
+    if old:
+        last_date = max(last_date, old[1])
+    with metrics.timed('sqlite.save_coverage'):
+        conn.execute(
+            'INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?)',
+            (ticker, first_date, last_date, now.strftime('%Y-%m-%d %H:%M:%S'))
+        )
+
+
+def update_history(tickers, start):
+    """Fetch only the bars missing from disk for the given tickers since start.
+
+    Goes through the process-wide market cache, so sessions asking for the same
+    ticker and start date at the same time share one download.
+    """
+    tickers = sorted({t.upper() for t in tickers})
+    if not tickers:
+        return
+
+    start_str = start.strftime('%Y-%m-%d')
+
+    def fetch_many(keys):
+        _update_history_uncached([ticker for _, ticker, _ in keys], start)
+        return {key: True for key in keys}
+
+    get_market_cache().get_many(
+        [('history', t, start_str) for t in tickers], fetch_many, TAIL_REFRESH_MINUTES * 60
+    )
+
+
+def _update_history_uncached(tickers, start):
+    now = datetime.now()
+    end = (now + timedelta(days=1)).strftime('%Y-%m-%d')
+    with _connect() as conn:
+        coverage = _load_coverage(conn, tickers)
+        refetch = {}
+        for fetch_start, group in _plan_fetches(tickers, coverage, start, now).items():
+            bars = _download(group, start=fetch_start, end=end)
+            for ticker in group:
+                old = coverage.get(ticker)
+                if old and ticker in bars and _restated(conn, ticker, bars[ticker], old[1]):
+                    # Drop the old price basis and download the whole window again below
+                    _drop_restated(conn, ticker)
+                    refetch.setdefault(min(start.strftime('%Y-%m-%d'), old[0]), []).append(ticker)
+                    continue
+                if ticker in bars:
+                    _save_bars(conn, ticker, bars[ticker])
+                _save_coverage(conn, ticker, fetch_start, bars, old, now)
+
+        for fetch_start, group in refetch.items():
+            bars = _download(group, start=fetch_start, end=end)
+            for ticker in group:
+                if ticker in bars:
+                    _save_bars(conn, ticker, bars[ticker])
+                _save_coverage(conn, ticker, fetch_start, bars, None, now)
+
+        with metrics.timed('sqlite.commit_history', tickers=len(tickers)):
+            conn.commit()
+
+
+def read_history(tickers, start, end=None, field='Close'):
+    """Read stored bars as a date x ticker frame without touching the network"""
+    tickers = sorted({t.upper() for t in tickers})
+    column = field.lower()
+    query = (
+        f'SELECT date, ticker, {column} FROM bars '
+        f'WHERE ticker IN ({",".join("?" * len(tickers))}) AND date >= ?'
+    )
+    params = [*tickers, start.strftime('%Y-%m-%d')]
+    if end is not None:
+        query += ' AND date <= ?'
+        params.append(end.strftime('%Y-%m-%d'))
+
+    with metrics.timed('sqlite.read_history', tickers=len(tickers)), _connect() as conn:
+        rows = pd.read_sql_query(query, conn, params=params)
+
+    if rows.empty:
+        return pd.DataFrame(columns=tickers, dtype=float)
+    frame = rows.pivot(index='date', columns='ticker', values=column)
+    frame.index = pd.to_datetime(frame.index)
+    frame.index.name = 'Date'
+    return frame.reindex(columns=tickers).sort_index()
+
+
+def load_history(tickers, start, end=None, field='Close'):
+    """Serve history from disk, downloading only the missing head/tail first"""
+    update_history(tickers, start)
+    return read_history(tickers, start, end=end, field=field)
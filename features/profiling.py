@@ -0,0 +1,121 @@
+import cProfile
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+
+PROFILE_RERUNS = os.getenv('PROFILE_RERUNS', '0') == '1'
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+# Number of most recent reruns whose artifacts are kept on disk
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '50'))
+SAMPLE_INTERVAL_SECONDS = 0.005
+TOP_N = 20
+
+# cProfile can only be active in one thread at a time on newer Pythons, so
+# concurrent profiled reruns fall back to stack sampling alone
+_cprofile_lock = threading.Lock()
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval into collapsed-stack counts"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL_SECONDS):
+        super().__init__(name='rerun-profiler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+def _rotate(directory, keep):
+    stems = sorted({os.path.splitext(name)[0] for name in os.listdir(directory)})
+    for stem in stems[:-keep] if keep > 0 else stems:
+        for ext in ('.pstats', '.collapsed'):
+            path = os.path.join(directory, stem + ext)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _top_functions(stats, n):
+    rows = [
+        {'Function': f'{func} ({os.path.basename(file)}:{line})', 'Calls': calls,
+         'Own (s)': own, 'Cumulative (s)': cumulative}
+        for (file, line, func), (_, calls, own, cumulative, _) in stats.stats.items()
+    ]
+    df = pd.DataFrame(rows, columns=['Function', 'Calls', 'Own (s)', 'Cumulative (s)'])
+    return df.sort_values('Own (s)', ascending=False).head(n).reset_index(drop=True)
+
+
+def _top_sampled(stacks, interval, n):
+    # Without pstats, attribute each sample to the innermost frame
+    leaves = Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rsplit(';', 1)[-1]] += count
+    rows = [{'Function': name, 'Samples': count, 'Own (s)': count * interval} for name, count in leaves.most_common(n)]
+    return pd.DataFrame(rows, columns=['Function', 'Samples', 'Own (s)'])
+
+
+@contextmanager
+def profile_rerun(label, directory=PROFILE_DIR, keep=PROFILE_KEEP, top_n=TOP_N):
+    """Profile the block and write <timestamp>_<label>.pstats and .collapsed into directory.
+
+    Yields a dict that is filled in on exit with 'seconds', 'top' (a frame of
+    the hottest functions by own time) and the artifact 'paths'. The
+    .collapsed file has one "frame;frame;frame count" line per distinct
+    stack, ready for flamegraph.pl or speedscope. Only the newest `keep`
+    reruns are kept.
+    """
+    result = {}
+    profiler = cProfile.Profile() if _cprofile_lock.acquire(blocking=False) else None
+    sampler = StackSampler(threading.get_ident())
+    start = time.perf_counter()
+    sampler.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield result
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _cprofile_lock.release()
+        sampler.stop()
+        result['seconds'] = time.perf_counter() - start
+
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"{datetime.now():%Y%m%d-%H%M%S-%f}_{re.sub(r'[^A-Za-z0-9]+', '_', label)}")
+        result['paths'] = [stem + '.collapsed']
+        with open(stem + '.collapsed', 'w') as f:
+            f.writelines(f'{stack} {count}\n' for stack, count in sampler.stacks.most_common())
+        if profiler is not None:
+            stats = pstats.Stats(profiler)
+            stats.dump_stats(stem + '.pstats')
+            result['paths'].insert(0, stem + '.pstats')
+            result['top'] = _top_functions(stats, top_n)
+        else:
+            result['top'] = _top_sampled(sampler.stacks, sampler.interval, top_n)
+        _rotate(directory, keep)
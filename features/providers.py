@@ -0,0 +1,330 @@
+"""Upstream market data and AI providers behind one interface.
+
+DATA_PROVIDER selects the implementation for the whole process:
+
+- live:   yfinance, Finnhub and Groq over the network, through features.rate_limit
+- record: live, and every successful response is also saved under RECORDINGS_DIR
+- replay: serve saved responses from memory, sleeping REPLAY_LATENCY_SECONDS per call
+
+Every provider offers download(tickers, **kwargs) like yf.download,
+ticker_info(ticker) like yf.Ticker(ticker).info, finnhub_get(url, params)
+returning a response with status_code/json()/raise_for_status(), and
+groq_client() returning an object with chat.completions.create(**kwargs).
+"""
+import functools
+import glob
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from types import SimpleNamespace
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from features import metrics, rate_limit
+
+DATA_PROVIDER = os.getenv('DATA_PROVIDER', 'live')
+RECORDINGS_DIR = os.getenv('RECORDINGS_DIR', 'recordings')
+REPLAY_LATENCY_SECONDS = float(os.getenv('REPLAY_LATENCY_SECONDS', '0'))
+REPLAY_CHUNK_SIZE = 16
+
+
+class ReplayMissError(LookupError):
+    pass
+
+
+@functools.lru_cache(maxsize=None)
+def get_session():
+    """One pooled HTTP session for every Finnhub request in the process"""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+    return session
+
+
+def get_finnhub(url, params):
+    response = get_session().get(url, params=params, timeout=10)
+    if response.status_code == 429 or response.status_code >= 500:
+        # Raise so the rate limiter can back off and retry
+        response.raise_for_status()
+    return response
+
+
+class RecordedResponse:
+    """The parts of a requests.Response the app reads, rebuilt from a recording"""
+
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} replayed error', response=self)
+
+
+class RateLimitedGroq:
+    """Groq client whose completions go through the 'groq' token bucket and circuit breaker"""
+
+    def __init__(self, client):
+        self.client = client
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        return rate_limit.call('groq', self.client.chat.completions.create, **kwargs)
+
+
+def _yf_download(tickers, **kwargs):
+    """yf.download that raises when Yahoo throttled any of the requested tickers.
+
+    yf.download does not raise on a 429: it logs it, records it in
+    yfinance.shared._ERRORS and returns NaN columns, so rate_limit.call
+    would never back off, retry or open the breaker.
+    """
+    # yfinance is imported on the first live call so replay runs never load it
+    import yfinance as yf
+    from yfinance import shared
+    from yfinance.exceptions import YFRateLimitError
+
+    data = yf.download(tickers, **kwargs)
+    requested = {t.upper() for t in _download_tickers(tickers)}
+    errors = [str(e) for t, e in dict(getattr(shared, '_ERRORS', {})).items() if str(t).upper() in requested]
+    if any('RateLimit' in e or 'Too Many Requests' in e for e in errors):
+        raise YFRateLimitError()
+    return data
+
+
+class LiveProvider:
+    name = 'live'
+
+    def download(self, tickers, **kwargs):
+        return rate_limit.call('yfinance', _yf_download, tickers, **kwargs)
+
+    def ticker_info(self, ticker):
+        import yfinance as yf
+        return rate_limit.call('yfinance', lambda: yf.Ticker(ticker).info)
+
+    def finnhub_get(self, url, params):
+        return rate_limit.call('finnhub', get_finnhub, url, params)
+
+    @functools.lru_cache(maxsize=None)
+    def groq_client(self):
+        # Imported on first use so pages that never call the AI don't import groq
+        from groq import Groq
+        return RateLimitedGroq(Groq(api_key=os.getenv('API_KEY')))
+
+
+def _canonical(value):
+    if isinstance(value, (datetime, date)):
+        # Downloads are keyed by day so a recording made earlier today still matches
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    return value
+
+
+def _download_tickers(tickers):
+    return [tickers] if isinstance(tickers, str) else list(tickers)
+
+
+def _split_download(data, tickers):
+    """Per-ticker slices of a yf.download frame, keeping its (field, ticker) columns"""
+    if data is None or data.empty:
+        return {}
+    if not isinstance(data.columns, pd.MultiIndex):
+        if len(tickers) != 1:
+            return {}
+        data = pd.concat({tickers[0]: data}, axis=1, names=['Ticker', 'Price']).swaplevel(axis=1)
+    present = set(data.columns.get_level_values(1))
+    return {t: data.xs(t, axis=1, level=1, drop_level=False) for t in tickers if t in present}
+
+
+def _groq_subject(kwargs):
+    return kwargs.get('model', '')
+
+
+def _finnhub_request(params):
+    # The API token is never written to disk
+    return {k: v for k, v in params.items() if k != 'token'}
+
+
+class RecordingStore:
+    """Pickled responses keyed by (kind, subject, request); lookups fall back to the newest same-subject entry"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.entries = None
+        self.latest = None
+
+    @staticmethod
+    def key(kind, subject, request):
+        text = json.dumps([kind, subject, _canonical(request)], sort_keys=True, default=str)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def save(self, kind, subject, request, value):
+        key = self.key(kind, subject, request)
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.recording.', dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump({'kind': kind, 'subject': subject, 'value': value}, f)
+        os.replace(tmp_path, os.path.join(self.directory, f'{kind}-{key[:32]}.pkl'))
+
+    def _load(self):
+        entries, latest = {}, {}
+        paths = sorted(glob.glob(os.path.join(self.directory, '*.pkl')), key=os.path.getmtime)
+        for path in paths:
+            with open(path, 'rb') as f:
+                record = pickle.load(f)
+            key = os.path.basename(path)[:-4]
+            entries[key] = record['value']
+            latest[(record['kind'], record['subject'])] = key
+        return entries, latest
+
+    def lookup(self, kind, subject, request):
+        with self.lock:
+            if self.entries is None:
+                self.entries, self.latest = self._load()
+        key = f'{kind}-{self.key(kind, subject, request)[:32]}'
+        if key not in self.entries:
+            key = self.latest.get((kind, subject))
+        if key is None:
+            raise ReplayMissError(f'No recording for {kind} {subject!r} in {self.directory}')
+        return self.entries[key]
+
+
+class RecordingProvider(LiveProvider):
+    """Live provider that also saves every successful response for later replay"""
+
+    name = 'record'
+
+    def __init__(self, directory=RECORDINGS_DIR):
+        self.store = RecordingStore(directory)
+
+    def download(self, tickers, **kwargs):
+        data = super().download(tickers, **kwargs)
+        # Saved per ticker: the batches the price store asks for depend on each ticker's
+        # stored coverage and on what other sessions have in flight, so they rarely repeat
+        for ticker, frame in _split_download(data, _download_tickers(tickers)).items():
+            self.store.save('download', ticker, kwargs, frame)
+        return data
+
+    def ticker_info(self, ticker):
+        info = super().ticker_info(ticker)
+        self.store.save('info', ticker, {}, info)
+        return info
+
+    def finnhub_get(self, url, params):
+        response = super().finnhub_get(url, params)
+        payload = response.json() if response.status_code < 400 else None
+        self.store.save('finnhub', params.get('symbol'), _finnhub_request(params),
+                        (response.status_code, payload))
+        return response
+
+    @functools.lru_cache(maxsize=None)
+    def groq_client(self):
+        live = super().groq_client()
+        store = self.store
+
+        def record_stream(stream, kwargs):
+            parts = []
+            try:
+                for chunk in stream:
+                    parts.append(chunk.choices[0].delta.content or '')
+                    yield chunk
+            finally:
+                close = getattr(stream, 'close', None)
+                if close is not None:
+                    close()
+            # Only streams read to the end are saved
+            store.save('groq', _groq_subject(kwargs), kwargs, ''.join(parts))
+
+        def create(**kwargs):
+            response = live.chat.completions.create(**kwargs)
+            if kwargs.get('stream'):
+                return record_stream(response, kwargs)
+            store.save('groq', _groq_subject(kwargs), kwargs, response.choices[0].message.content)
+            return response
+
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+class ReplayProvider:
+    """Serves recorded responses from memory with optional injected latency; never touches the network"""
+
+    name = 'replay'
+
+    def __init__(self, directory=RECORDINGS_DIR, latency=REPLAY_LATENCY_SECONDS):
+        self.store = RecordingStore(directory)
+        self.latency = latency
+
+    def _lookup(self, kind, subject, request):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.store.lookup(kind, subject, request)
+
+    def download(self, tickers, **kwargs):
+        """Any batch rebuilt from per-ticker recordings; unrecorded tickers are left out, like a failed download"""
+        if self.latency:
+            time.sleep(self.latency)
+        frames = []
+        for ticker in _download_tickers(tickers):
+            try:
+                frames.append(self.store.lookup('download', ticker, kwargs))
+            except ReplayMissError:
+                metrics.increment('replay.download_miss')
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1) if len(frames) > 1 else frames[0].copy()
+
+    def ticker_info(self, ticker):
+        return dict(self._lookup('info', ticker, {}))
+
+    def finnhub_get(self, url, params):
+        status_code, payload = self._lookup('finnhub', params.get('symbol'), _finnhub_request(params))
+        return RecordedResponse(status_code, payload)
+
+    def groq_client(self):
+        def chunks(text):
+            for i in range(0, len(text), REPLAY_CHUNK_SIZE):
+                delta = SimpleNamespace(content=text[i:i + REPLAY_CHUNK_SIZE])
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+        def create(**kwargs):
+            text = self._lookup('groq', _groq_subject(kwargs), kwargs)
+            if kwargs.get('stream'):
+                return chunks(text)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+PROVIDERS = {'live': LiveProvider, 'record': RecordingProvider, 'replay': ReplayProvider}
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """The process-wide provider selected by DATA_PROVIDER"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            if DATA_PROVIDER not in PROVIDERS:
+                raise ValueError(f"DATA_PROVIDER must be one of {', '.join(PROVIDERS)}, not {DATA_PROVIDER!r}")
+            _provider = PROVIDERS[DATA_PROVIDER]()
+        return _provider
+
+
+def set_provider(provider):
+    """Swap in another provider, e.g. a synthetic one for benchmarks; returns the previous one"""
+    global _provider
+    with _provider_lock:
+        previous, _provider = _provider, provider
+    return previous
@@ -0,0 +1,139 @@
+import json
+import threading
+from datetime import datetime
+import pandas as pd
+from features.market_cache import get_market_cache, QUOTE_TTL_SECONDS, INFO_TTL_SECONDS
+from features.refresh_engine import run_bounded
+from features import metrics, storage
+from features.providers import get_provider
+
+QUOTE_COLUMNS = ['price', 'previous_close']
+FALLBACK_WORKERS = 8
+FALLBACK_TIMEOUT = 10.0
+FRESHNESS_FILE = 'quote_freshness.json'
+
+# The scheduler thread and script threads both update the freshness file
+_freshness_lock = threading.Lock()
+
+
+def _batch_quotes(tickers):
+    """Last price and previous close for every ticker from one multi-ticker download"""
+    with metrics.timed('yfinance.quotes', tickers=len(tickers)):
+        data = get_provider().download(tickers, period='5d', interval='1d', auto_adjust=False,
+                                       group_by='column', progress=False)
+    if data is None or data.empty:
+        return pd.DataFrame(columns=QUOTE_COLUMNS, dtype=float)
+
+    closes = data['Close']
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(tickers[0])
+    closes = closes.reindex(columns=tickers)
+
+    # Count valid bars per ticker so a symbol with a single bar is left to the fallback
+    valid = closes.notna()
+    last = closes.ffill().iloc[-1]
+    previous = closes.where(valid.cumsum() < valid.sum()).ffill().iloc[-1]
+    quotes = pd.DataFrame({'price': last, 'previous_close': previous})
+    return quotes.dropna()
+
+
+def _ticker_info(ticker):
+    with metrics.timed('yfinance.info', tickers=1):
+        return get_provider().ticker_info(ticker)
+
+
+def _info_quote(ticker):
+    info = _ticker_info(ticker)
+    return info.get('regularMarketPrice'), info.get('previousClose')
+
+
+def _fallback_quotes(tickers, max_workers, timeout):
+    results, _, _ = run_bounded(_info_quote, tickers, max_workers=max_workers, timeout=timeout)
+    rows = {
+        ticker: (float(price), float(previous_close))
+        for ticker, (price, previous_close) in results.items()
+        if price is not None and previous_close is not None
+    }
+    return pd.DataFrame.from_dict(rows, orient='index', columns=QUOTE_COLUMNS)
+
+
+def _fetch_quotes_uncached(tickers, max_workers, timeout):
+    try:
+        quotes = _batch_quotes(tickers)
+    except Exception:
+        quotes = pd.DataFrame(columns=QUOTE_COLUMNS, dtype=float)
+
+    missing = [t for t in tickers if t not in quotes.index]
+    if missing:
+        quotes = pd.concat([quotes, _fallback_quotes(missing, max_workers, timeout)])
+    return quotes.astype(float)
+
+
+def load_freshness():
+    """ticker -> time its quote was last fetched upstream"""
+    text = storage.read_text(FRESHNESS_FILE)
+    stamps = json.loads(text) if text else {}
+    return {ticker: datetime.strptime(stamp, '%Y-%m-%d %H:%M:%S') for ticker, stamp in stamps.items()}
+
+
+def _record_freshness(tickers):
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    # read_text sees a pending coalesced write, so holding the lock across the
+    # read and the write keeps one thread's stamps from dropping another's
+    with _freshness_lock:
+        text = storage.read_text(FRESHNESS_FILE)
+        stamps = json.loads(text) if text else {}
+        stamps.update({ticker: now for ticker in tickers})
+        storage.write_text(FRESHNESS_FILE, json.dumps(stamps, indent=1, sort_keys=True))
+
+
+def _quote_values(quotes):
+    return {('quote', ticker): tuple(row) for ticker, row in zip(quotes.index, quotes.itertuples(index=False))}
+
+
+def _quotes_frame(values):
+    rows = {ticker: value for (_, ticker), value in values.items() if value is not None}
+    return pd.DataFrame.from_dict(rows, orient='index', columns=QUOTE_COLUMNS).astype(float)
+
+
+def publish_quotes(tickers, ttl, max_workers=FALLBACK_WORKERS, timeout=FALLBACK_TIMEOUT):
+    """Fetch quotes upstream and publish them into the shared market cache for every session"""
+    tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    quotes = _fetch_quotes_uncached(tickers, max_workers, timeout)
+    get_market_cache().put_many(_quote_values(quotes), ttl)
+    _record_freshness(quotes.index)
+    return quotes
+
+
+def peek_quotes(tickers):
+    """Quotes already in the shared cache, without any network call"""
+    keys = [('quote', t.upper()) for t in tickers]
+    return _quotes_frame(get_market_cache().peek_many(keys))
+
+
+def fetch_quotes(tickers, max_workers=FALLBACK_WORKERS, timeout=FALLBACK_TIMEOUT):
+    """Return a frame indexed by ticker with 'price' and 'previous_close' columns.
+
+    Quotes come from the process-wide market cache; symbols that are not cached
+    or already being fetched by another session are downloaded in one batch.
+    Tickers missing from the batched download are retried individually on a
+    bounded thread pool with a per-ticker timeout; tickers that still fail or
+    time out are left out of the result.
+    """
+    tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    if not tickers:
+        return pd.DataFrame(columns=QUOTE_COLUMNS, dtype=float)
+
+    def fetch_many(keys):
+        quotes = _fetch_quotes_uncached([ticker for _, ticker in keys], max_workers, timeout)
+        _record_freshness(quotes.index)
+        return _quote_values(quotes)
+
+    values = get_market_cache().get_many([('quote', t) for t in tickers], fetch_many, QUOTE_TTL_SECONDS)
+    return _quotes_frame(values)
+
+
+def fetch_info(ticker):
+    """yfinance .info for one ticker, shared across sessions for a few minutes"""
+    ticker = ticker.upper()
+    return get_market_cache().get(('info', ticker), lambda: _ticker_info(ticker), INFO_TTL_SECONDS)
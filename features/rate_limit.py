@@ -0,0 +1,143 @@
+import random
+import threading
+import time
+
+# Steady-state requests per second and burst size for each upstream provider
+PROVIDER_LIMITS = {
+    'yfinance': {'rate': 2.0, 'burst': 5},
+    'finnhub': {'rate': 1.0, 'burst': 5},
+    'groq': {'rate': 0.5, 'burst': 3},
+}
+MIN_RATE_FRACTION = 0.1
+RECOVERY_STEP_FRACTION = 0.05
+MAX_RETRIES = 3
+BASE_DELAY_SECONDS = 0.5
+MAX_DELAY_SECONDS = 8.0
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN_SECONDS = 30.0
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class AdaptiveTokenBucket:
+    """Token bucket whose refill rate halves on throttling and creeps back up on success (AIMD)"""
+
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def throttled(self):
+        with self.lock:
+            self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate / 2)
+
+    def succeeded(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_STEP_FRACTION)
+
+
+class CircuitBreaker:
+    """Fails fast after repeated failures, then lets a single trial call through after a cooldown"""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    def before_call(self, provider):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining > 0 or self.trial_running:
+                raise CircuitOpenError(
+                    f'{provider} is temporarily unavailable after repeated failures; '
+                    f'retrying in {max(remaining, 0):.0f}s'
+                )
+            self.trial_running = True
+
+    def record(self, success):
+        with self.lock:
+            self.trial_running = False
+            if success:
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                if self.failures >= self.threshold:
+                    self.opened_at = time.monotonic()
+
+
+_registry_lock = threading.Lock()
+_buckets = {}
+_breakers = {}
+
+
+def _provider_state(provider):
+    with _registry_lock:
+        if provider not in _buckets:
+            _buckets[provider] = AdaptiveTokenBucket(**PROVIDER_LIMITS[provider])
+            _breakers[provider] = CircuitBreaker()
+        return _buckets[provider], _breakers[provider]
+
+
+def is_throttled(error):
+    status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    return status == 429 or 'RateLimit' in type(error).__name__ or 'Too Many Requests' in str(error)
+
+
+def is_retryable(error):
+    if is_throttled(error):
+        return True
+    status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    if status is not None:
+        return status >= 500
+    return isinstance(error, (ConnectionError, TimeoutError)) or any(
+        word in type(error).__name__ for word in ('Connection', 'Timeout')
+    )
+
+
+def call(provider, fn, *args, **kwargs):
+    """Call fn through the provider's token bucket, circuit breaker and jittered retry policy"""
+    bucket, breaker = _provider_state(provider)
+    for attempt in range(MAX_RETRIES + 1):
+        breaker.before_call(provider)
+        bucket.acquire()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if is_throttled(e):
+                bucket.throttled()
+            retryable = is_retryable(e)
+            # Errors such as an unknown ticker say nothing about provider health
+            breaker.record(success=not retryable)
+            if not retryable or attempt == MAX_RETRIES:
+                raise
+            time.sleep(random.uniform(0, min(MAX_DELAY_SECONDS, BASE_DELAY_SECONDS * 2 ** attempt)))
+            continue
+        bucket.succeeded()
+        breaker.record(success=True)
+        return result
@@ -0,0 +1,57 @@
+import contextvars
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+POLL_SECONDS = 0.1
+
+
+def run_bounded(fn, items, max_workers=16, timeout=10.0):
+    """Run fn(item) for every item concurrently with a per-item deadline.
+
+    Returns (results, errors, timed_out): results maps item -> return value for
+    calls that finished within `timeout` seconds of starting, errors maps
+    item -> exception, and timed_out lists items that were abandoned. Wall time
+    is bounded by one deadline per batch of `max_workers` items, never by the
+    sum of all calls. fn runs on worker threads, so it must not call streamlit.
+    """
+    items = list(dict.fromkeys(items))
+    results, errors, timed_out = {}, {}, []
+    if not items:
+        return results, errors, timed_out
+
+    started = {}
+
+    def timed(item):
+        started[item] = time.monotonic()
+        return fn(item)
+
+    workers = max(1, min(max_workers, len(items)))
+    overall_deadline = time.monotonic() + timeout * math.ceil(len(items) / workers) + POLL_SECONDS
+    pool = ThreadPoolExecutor(max_workers=workers)
+    # Each worker runs in a copy of the caller's context so metrics keep the page tag
+    futures = {pool.submit(contextvars.copy_context().run, timed, item): item for item in items}
+    pending = set(futures)
+
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = futures[future]
+                try:
+                    results[item] = future.result()
+                except Exception as e:
+                    errors[item] = e
+
+            now = time.monotonic()
+            if now >= overall_deadline:
+                expired = set(pending)
+            else:
+                expired = {f for f in pending if futures[f] in started and now - started[futures[f]] > timeout}
+            timed_out.extend(futures[f] for f in expired)
+            pending -= expired
+    finally:
+        # Abandon stragglers instead of joining them; their results are discarded
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return results, errors, timed_out
@@ -1,13 +1,17 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
+from datetime import datetime, timedelta
+from features.price_store import load_history
+
+PERIOD_DAYS = {'1mo': 30, '3mo': 90, '6mo': 182, '1y': 365, '2y': 730, '5y': 365 * 5, '10y': 3650}
 
 
 def download_data(ticker, benchmark='SPY', period='1y'):
-    stock_df = yf.download(ticker, period=period, auto_adjust=True)
-    market_df = yf.download(benchmark, period=period, auto_adjust=True)
+    ticker, benchmark = ticker.upper(), benchmark.upper()
+    start_date = datetime.today() - timedelta(days=PERIOD_DAYS[period])
+    prices = load_history([ticker, benchmark], start_date)
 
-    return stock_df['Close'].dropna(), market_df['Close'].dropna()
+    return prices[[ticker]].dropna(), prices[[benchmark]].dropna()
 
 def compute_daily_returns(prices):
     return prices.pct_change().dropna()
@@ -31,4 +35,58 @@ def calculate_sharpe_ratio(returns, risk_free_rate=0.01):
     return (excess.mean() / excess.std()) * np.sqrt(252)
 
 def calculate_var(returns, confidence=0.95):
-    return np.percentile(returns, (1 - confidence) * 100)
\ No newline at end of file
+    return np.percentile(returns, (1 - confidence) * 100)
+
+def download_prices(tickers, benchmark='SPY', period='1y'):
+    tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    benchmark = benchmark.upper()
+    start_date = datetime.today() - timedelta(days=PERIOD_DAYS[period])
+    prices = load_history(tickers + [benchmark], start_date)
+
+    return prices.reindex(columns=tickers), prices[benchmark]
+
+
+def _returns_matrix(prices):
+    # Same as dropna() then pct_change() on each column, but for all columns at once
+    valid = prices.notna()
+    return prices.ffill().pct_change(fill_method=None).where(valid)
+
+
+def calculate_risk_table(prices, market_prices, risk_free_rate=0.01, confidence=0.95):
+    """Every risk metric above for every column of prices in one vectorized pass.
+
+    prices is a date x ticker frame and market_prices a benchmark Series. The
+    values match calling the single-series functions on each column in turn.
+    """
+    returns = _returns_matrix(prices)
+    market = _returns_matrix(market_prices.to_frame()).iloc[:, 0].reindex(returns.index)
+
+    r = returns.to_numpy(dtype=float)
+    m = market.to_numpy(dtype=float)[:, None]
+    mask = np.isfinite(r) & np.isfinite(m)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vol = np.nanstd(r, axis=0) * np.sqrt(252)
+
+        # Pairwise-aligned beta: sample covariance over population market variance, as in calculate_beta
+        n = mask.sum(axis=0)
+        r_aligned = np.where(mask, r, 0.0)
+        m_aligned = np.where(mask, m, 0.0)
+        r_dev = np.where(mask, r_aligned - r_aligned.sum(axis=0) / n, 0.0)
+        m_dev = np.where(mask, m_aligned - m_aligned.sum(axis=0) / n, 0.0)
+        beta = ((r_dev * m_dev).sum(axis=0) / (n - 1)) / ((m_dev ** 2).sum(axis=0) / n)
+
+        # calculate_max_drawdown measures from the second bar, so drop each column's first price
+        p = prices.ffill().where(prices.notna().cumsum() > 1)
+        mdd = (p / p.cummax() - 1).min().to_numpy(dtype=float)
+
+        excess = r - risk_free_rate / 252
+        sharpe = np.nanmean(excess, axis=0) / np.nanstd(excess, axis=0, ddof=1) * np.sqrt(252)
+
+        var = np.nanpercentile(r, (1 - confidence) * 100, axis=0)
+
+    return pd.DataFrame(
+        np.column_stack([vol, beta, mdd, sharpe, var]),
+        index=prices.columns,
+        columns=['Volatility', 'Beta', 'Max Drawdown', 'Sharpe Ratio', f'VaR ({confidence:.0%})']
+    )
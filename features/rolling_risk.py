@@ -0,0 +1,196 @@
+import json
+import math
+import sqlite3
+from collections import deque
+from datetime import datetime, timedelta
+import pandas as pd
+from features import metrics
+from features.price_store import PRICE_DB_FILE, update_history, read_history
+
+ROLLING_WINDOWS = (20, 60, 252)
+ROLLING_METRICS = ['volatility', 'beta', 'sharpe', 'drawdown']
+SEED_DAYS = 365 * 3
+
+
+class RollingRisk:
+    """Sliding-window volatility, beta, Sharpe and drawdown updated in O(1) per bar.
+
+    Means, second moments and the stock/market co-moment use Welford's add and
+    remove updates over a ring buffer of the last `window` returns; the window
+    high for drawdown is kept in a monotonic deque.
+    """
+
+    def __init__(self, window, risk_free_rate=0.01):
+        self.window = window
+        self.risk_free_rate = risk_free_rate
+        self.n = 0
+        self.mean_r = 0.0
+        self.mean_m = 0.0
+        self.m2_r = 0.0
+        self.m2_m = 0.0
+        self.c_rm = 0.0
+        self.returns = deque()
+        self.highs = deque()
+        self.bar = 0
+        self.last_price = None
+        self.last_market = None
+
+    def _add(self, r, m):
+        self.n += 1
+        dr = r - self.mean_r
+        self.mean_r += dr / self.n
+        self.m2_r += dr * (r - self.mean_r)
+        dm = m - self.mean_m
+        self.mean_m += dm / self.n
+        self.m2_m += dm * (m - self.mean_m)
+        self.c_rm += dr * (m - self.mean_m)
+
+    def _remove(self, r, m):
+        self.n -= 1
+        if self.n == 0:
+            self.mean_r = self.mean_m = self.m2_r = self.m2_m = self.c_rm = 0.0
+            return
+        dr = r - self.mean_r
+        self.mean_r -= dr / self.n
+        self.m2_r -= dr * (r - self.mean_r)
+        self.c_rm -= (r - self.mean_r) * (m - self.mean_m)
+        dm = m - self.mean_m
+        self.mean_m -= dm / self.n
+        self.m2_m -= dm * (m - self.mean_m)
+
+    def update(self, price, market_price):
+        """Append one bar; returns the metrics dict once the window is full, else None"""
+        self.bar += 1
+        while self.highs and self.highs[-1][1] <= price:
+            self.highs.pop()
+        self.highs.append((self.bar, price))
+        if self.highs[0][0] <= self.bar - self.window:
+            self.highs.popleft()
+
+        if self.last_price is not None:
+            r = price / self.last_price - 1
+            m = market_price / self.last_market - 1
+            self.returns.append((r, m))
+            self._add(r, m)
+            if len(self.returns) > self.window:
+                self._remove(*self.returns.popleft())
+        self.last_price = price
+        self.last_market = market_price
+
+        if self.n < self.window:
+            return None
+
+        std_r = math.sqrt(max(self.m2_r, 0.0) / (self.n - 1))
+        return {
+            'volatility': math.sqrt(max(self.m2_r, 0.0) / self.n) * math.sqrt(252),
+            'beta': self.c_rm / self.m2_m if self.m2_m > 0 else float('nan'),
+            'sharpe': (self.mean_r - self.risk_free_rate / 252) / std_r * math.sqrt(252) if std_r > 0 else float('nan'),
+            'drawdown': price / self.highs[0][1] - 1
+        }
+
+    def to_json(self):
+        state = dict(self.__dict__)
+        state['returns'] = list(self.returns)
+        state['highs'] = list(self.highs)
+        return json.dumps(state)
+
+    @classmethod
+    def from_json(cls, text):
+        state = json.loads(text)
+        rolling = cls(state['window'], state['risk_free_rate'])
+        rolling.__dict__.update(state)
+        rolling.returns = deque(tuple(x) for x in state['returns'])
+        rolling.highs = deque(tuple(x) for x in state['highs'])
+        return rolling
+
+
+def _connect():
+    conn = sqlite3.connect(PRICE_DB_FILE, timeout=30)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS rolling_state ('
+        'ticker TEXT NOT NULL, benchmark TEXT NOT NULL, window INTEGER NOT NULL, '
+        'last_date TEXT, state TEXT, PRIMARY KEY (ticker, benchmark, window))'
+    )
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS rolling_metrics ('
+        'ticker TEXT NOT NULL, benchmark TEXT NOT NULL, window INTEGER NOT NULL, date TEXT NOT NULL, '
+        'volatility REAL, beta REAL, sharpe REAL, drawdown REAL, '
+        'PRIMARY KEY (ticker, benchmark, window, date))'
+    )
+    return conn
+
+
+def _saved_states(ticker, benchmark):
+    with metrics.timed('sqlite.rolling_state_load'), _connect() as conn:
+        return {
+            row[0]: (row[1], row[2]) for row in conn.execute(
+                'SELECT window, last_date, state FROM rolling_state WHERE ticker = ? AND benchmark = ?',
+                (ticker, benchmark)
+            )
+        }
+
+
+def _history_start(saved, windows):
+    if all(w in saved for w in windows):
+        return datetime.strptime(min(saved[w][0] for w in windows), '%Y-%m-%d')
+    return datetime.today() - timedelta(days=SEED_DAYS)
+
+
+def update_rolling_metrics(ticker, benchmark='SPY', windows=ROLLING_WINDOWS):
+    """Feed completed bars newer than each window's saved state into it and persist the new points"""
+    ticker, benchmark = ticker.upper(), benchmark.upper()
+    today = datetime.today().strftime('%Y-%m-%d')
+
+    saved = _saved_states(ticker, benchmark)
+    start = _history_start(saved, windows)
+    update_history([ticker, benchmark], start)
+    # A split or dividend restatement drops the saved states, which are then reseeded
+    # from the re-downloaded history
+    current = _saved_states(ticker, benchmark)
+    if current != saved:
+        saved = current
+        start = _history_start(saved, windows)
+        update_history([ticker, benchmark], start)
+    prices = read_history([ticker, benchmark], start).dropna()
+    # Only completed sessions are fed in; today's bar can still change
+    prices = prices[prices.index.strftime('%Y-%m-%d') < today]
+
+    points, states = [], []
+    for window in windows:
+        if window in saved:
+            last_date, state = saved[window]
+            rolling = RollingRisk.from_json(state)
+            new_bars = prices[prices.index.strftime('%Y-%m-%d') > last_date]
+        else:
+            last_date, rolling = None, RollingRisk(window)
+            new_bars = prices
+        if new_bars.empty:
+            continue
+
+        for date, price, market_price in zip(new_bars.index, new_bars[ticker], new_bars[benchmark]):
+            point = rolling.update(float(price), float(market_price))
+            if point is not None:
+                points.append((ticker, benchmark, window, date.strftime('%Y-%m-%d'),
+                               *(point[k] for k in ROLLING_METRICS)))
+        states.append((ticker, benchmark, window, new_bars.index.max().strftime('%Y-%m-%d'), rolling.to_json()))
+
+    with metrics.timed('sqlite.rolling_state_save'), _connect() as conn:
+        conn.executemany('INSERT OR REPLACE INTO rolling_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?)', points)
+        conn.executemany('INSERT OR REPLACE INTO rolling_state VALUES (?, ?, ?, ?, ?)', states)
+
+
+def read_rolling_metrics(ticker, metric, benchmark='SPY', windows=ROLLING_WINDOWS):
+    """Stored rolling series for one metric as a date x window frame"""
+    placeholders = ','.join('?' * len(windows))
+    with metrics.timed('sqlite.read_rolling_metrics'), _connect() as conn:
+        rows = pd.read_sql_query(
+            f'SELECT date, window, {metric} FROM rolling_metrics '
+            f'WHERE ticker = ? AND benchmark = ? AND window IN ({placeholders})',
+            conn, params=[ticker.upper(), benchmark.upper(), *windows]
+        )
+    if rows.empty:
+        return pd.DataFrame()
+    frame = rows.pivot(index='date', columns='window', values=metric)
+    frame.index = pd.to_datetime(frame.index)
+    frame.columns = [f'{w}-day' for w in frame.columns]
+    return frame.sort_index()
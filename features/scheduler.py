@@ -0,0 +1,75 @@
+import os
+import threading
+from datetime import datetime, time as dt_time
+from zoneinfo import ZoneInfo
+import streamlit as st
+
+QUOTE_SCHEDULER_ENABLED = os.getenv('QUOTE_SCHEDULER', '1') != '0'
+QUOTE_REFRESH_SECONDS = float(os.getenv('QUOTE_REFRESH_SECONDS', '60'))
+MARKET_TZ = ZoneInfo('America/New_York')
+MARKET_OPEN = dt_time(9, 30)
+MARKET_CLOSE = dt_time(16, 0)
+
+
+def market_is_open(now=None):
+    # Imported here so starting the scheduler from app.py stays cheap
+    from features.lookback import TRADING_DAY
+
+    now = now or datetime.now(MARKET_TZ)
+    return TRADING_DAY.is_on_offset(now.replace(tzinfo=None)) and MARKET_OPEN <= now.time() <= MARKET_CLOSE
+
+
+def scheduled_tickers():
+    """Union of held tickers in the ledger and watchlist tickers as currently saved"""
+    from features import storage
+    from features.ledger import positions_as_of
+
+    positions = positions_as_of()
+    tickers = set(positions.index[positions.abs() > 1e-9])
+    df = storage.read_csv(storage.WATCHLIST_FILE)
+    if df is not None and 'Ticker' in df.columns:
+        tickers.update(df['Ticker'].dropna().astype(str).str.upper())
+    return sorted(tickers)
+
+
+class QuoteScheduler(threading.Thread):
+    """Daemon thread that publishes fresh quotes into the shared market cache during market hours"""
+
+    def __init__(self, interval=QUOTE_REFRESH_SECONDS):
+        super().__init__(name='quote-scheduler', daemon=True)
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.last_run = None
+        self.last_error = None
+
+    def refresh_once(self):
+        from features.quotes import publish_quotes
+
+        tickers = scheduled_tickers()
+        if tickers:
+            # Quotes stay valid until the run after next, so pages never see a gap
+            publish_quotes(tickers, ttl=self.interval * 2)
+        self.last_run = datetime.now()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if market_is_open():
+                try:
+                    self.refresh_once()
+                    self.last_error = None
+                except Exception as e:
+                    self.last_error = e
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+
+
+@st.cache_resource
+def start_quote_scheduler():
+    """Start the one scheduler thread for this process; returns None when disabled"""
+    if not QUOTE_SCHEDULER_ENABLED:
+        return None
+    scheduler = QuoteScheduler()
+    scheduler.start()
+    return scheduler
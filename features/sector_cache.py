@@ -0,0 +1,137 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from features import metrics, storage
+
+SECTOR_CACHE_FILE = 'sector_cache.json'
+SECTOR_CACHE_VERSION = 1
+SECTOR_TTL_DAYS = 90
+# Tickers the model answered outside SECTORS (ETFs, index funds...) are cached as
+# a negative entry for this long, so they are not re-asked on every rerun
+UNCLASSIFIED_TTL_DAYS = 1
+
+SECTORS = [
+    'Technology', 'Healthcare', 'Financials', 'Consumer Discretionary', 'Consumer Staples',
+    'Energy', 'Industrials', 'Materials', 'Utilities', 'Real Estate', 'Communication Services'
+]
+
+# Used when Groq is unavailable so offline runs still produce a stable pie chart
+OFFLINE_SECTORS = {
+    'AAPL': 'Technology', 'MSFT': 'Technology', 'NVDA': 'Technology', 'AVGO': 'Technology',
+    'ORCL': 'Technology', 'CRM': 'Technology', 'AMD': 'Technology', 'INTC': 'Technology',
+    'GOOGL': 'Communication Services', 'GOOG': 'Communication Services', 'META': 'Communication Services',
+    'NFLX': 'Communication Services', 'DIS': 'Communication Services', 'T': 'Communication Services',
+    'VZ': 'Communication Services', 'AMZN': 'Consumer Discretionary', 'TSLA': 'Consumer Discretionary',
+    'HD': 'Consumer Discretionary', 'MCD': 'Consumer Discretionary', 'NKE': 'Consumer Discretionary',
+    'WMT': 'Consumer Staples', 'PG': 'Consumer Staples', 'KO': 'Consumer Staples', 'PEP': 'Consumer Staples',
+    'COST': 'Consumer Staples', 'JPM': 'Financials', 'BAC': 'Financials', 'WFC': 'Financials',
+    'GS': 'Financials', 'V': 'Financials', 'MA': 'Financials', 'BRK-B': 'Financials',
+    'JNJ': 'Healthcare', 'UNH': 'Healthcare', 'PFE': 'Healthcare', 'LLY': 'Healthcare',
+    'MRK': 'Healthcare', 'ABBV': 'Healthcare', 'XOM': 'Energy', 'CVX': 'Energy', 'COP': 'Energy',
+    'BA': 'Industrials', 'CAT': 'Industrials', 'GE': 'Industrials', 'UPS': 'Industrials',
+    'LIN': 'Materials', 'NEM': 'Materials', 'NEE': 'Utilities', 'DUK': 'Utilities', 'SO': 'Utilities',
+    'PLD': 'Real Estate', 'AMT': 'Real Estate', 'O': 'Real Estate',
+}
+
+_lock = threading.Lock()
+_cache = {'mtime': None, 'sectors': {}}
+
+
+def _read_cache():
+    """Sector entries from disk, re-read only when another session has rewritten the file"""
+    if not os.path.exists(SECTOR_CACHE_FILE):
+        return {}
+    mtime = os.path.getmtime(SECTOR_CACHE_FILE)
+    if mtime != _cache['mtime']:
+        try:
+            with open(SECTOR_CACHE_FILE, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        sectors = data.get('sectors', {}) if data.get('version') == SECTOR_CACHE_VERSION else {}
+        _cache.update(mtime=mtime, sectors=sectors)
+    return _cache['sectors']
+
+
+def _write_cache(sectors):
+    payload = json.dumps({'version': SECTOR_CACHE_VERSION, 'sectors': sectors}, indent=1, sort_keys=True)
+    storage.write_text(SECTOR_CACHE_FILE, payload, coalesce=False)
+    _cache.update(mtime=os.path.getmtime(SECTOR_CACHE_FILE), sectors=sectors)
+
+
+def offline_classify(tickers):
+    return {ticker: OFFLINE_SECTORS.get(ticker, 'Other') for ticker in tickers}
+
+
+def classify_batch(tickers, client):
+    """Classify all tickers with a single Groq completion returning a JSON ticker -> sector map"""
+    prompt = (
+        "Classify each of these companies by ticker into exactly one of these sectors: "
+        f"{', '.join(SECTORS)}.\n"
+        f"Tickers: {', '.join(tickers)}\n"
+        'Respond with only a JSON object mapping each ticker to its sector name, e.g. {"AAPL": "Technology"}.'
+    )
+    with metrics.timed('groq.sector_classification', tickers=len(tickers)):
+        completion = client.chat.completions.create(
+            model="llama3-8b-8192",
+            messages=[
+                {"role": "system",
+                 "content": "You are a financial assistant that classifies companies into one of the provided sectors."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0
+        )
+    content = completion.choices[0].message.content
+    match = re.search(r'\{.*\}', content, re.DOTALL)
+    mapping = json.loads(match.group(0)) if match else {}
+    mapping = {str(k).strip().upper(): str(v).strip() for k, v in mapping.items()}
+    return {ticker: mapping[ticker] for ticker in tickers if mapping.get(ticker) in SECTORS}
+
+
+def get_sectors(tickers, get_client=None):
+    """Return (ticker -> sector, error) using the shared on-disk cache.
+
+    Expired or missing tickers are classified in one batched prompt and
+    written back; tickers the model puts outside SECTORS are cached briefly
+    with the offline answer. get_client builds the Groq client and is only
+    called when something is missing. Without it, or if the request fails,
+    the offline stand-in fills the gaps without being cached.
+    """
+    tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    now = datetime.now()
+
+    def fresh(entry):
+        ttl = timedelta(days=entry.get('ttl_days', SECTOR_TTL_DAYS))
+        return entry['updated'] >= (now - ttl).strftime('%Y-%m-%d %H:%M:%S')
+
+    with _lock:
+        cached = _read_cache()
+    sectors = {t: cached[t]['sector'] for t in tickers if t in cached and fresh(cached[t])}
+    misses = [t for t in tickers if t not in sectors]
+    if not misses:
+        return sectors, None
+
+    error = None
+    classified, unclassified = {}, {}
+    if get_client is not None:
+        try:
+            classified = classify_batch(misses, get_client())
+            unclassified = offline_classify([t for t in misses if t not in classified])
+        except Exception as e:
+            error = e
+
+    if classified or unclassified:
+        with _lock:
+            updated = dict(_read_cache())
+            stamp = now.strftime('%Y-%m-%d %H:%M:%S')
+            updated.update({t: {'sector': s, 'updated': stamp} for t, s in classified.items()})
+            updated.update({t: {'sector': s, 'updated': stamp, 'ttl_days': UNCLASSIFIED_TTL_DAYS}
+                            for t, s in unclassified.items()})
+            _write_cache(updated)
+        sectors.update(classified)
+        sectors.update(unclassified)
+
+    sectors.update(offline_classify([t for t in misses if t not in sectors]))
+    return sectors, error
@@ -0,0 +1,144 @@
+import atexit
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+import pandas as pd
+from features import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: rely on the atomic rename alone
+    fcntl = None
+
+# Writes to the same file within this window are collapsed into one
+COALESCE_SECONDS = 0.5
+
+# CSV files the pages and the quote scheduler share
+PORTFOLIO_FILE = 'portfolio.csv'  # price cache only: last known share price and daily change per ticker
+CASH_FILE = 'cash.csv'
+WATCHLIST_FILE = 'watchlist.csv'
+
+_lock = threading.Lock()
+_pending = {}
+_timers = {}
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive inter-process lock on a sidecar .lock file"""
+    if fcntl is None:
+        yield
+        return
+    with open(f'{path}.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _atomic_write(path, write_fn):
+    """Write to a temp file in the same directory, fsync it, then rename it over path"""
+    directory = os.path.dirname(os.path.abspath(path))
+    with _file_lock(path):
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', newline='') as f:
+                write_fn(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def _write_now(path, kind, payload):
+    with metrics.timed(f'storage.write_{kind}'):
+        if kind == 'csv':
+            _atomic_write(path, lambda f: payload.to_csv(f, index=False))
+        else:
+            _atomic_write(path, lambda f: f.write(payload))
+
+
+def _schedule(path, kind, payload, coalesce):
+    if not coalesce:
+        with _lock:
+            _pending.pop(path, None)
+            timer = _timers.pop(path, None)
+        if timer is not None:
+            timer.cancel()
+        _write_now(path, kind, payload)
+        return
+
+    with _lock:
+        _pending[path] = (kind, payload)
+        if path not in _timers:
+            timer = threading.Timer(COALESCE_SECONDS, flush, args=(path,))
+            timer.daemon = True
+            _timers[path] = timer
+            timer.start()
+
+
+def flush(path=None):
+    """Write out pending coalesced writes for one path, or for all paths"""
+    with _lock:
+        paths = list(_pending) if path is None else [path]
+        jobs = []
+        for p in paths:
+            timer = _timers.pop(p, None)
+            if timer is not None:
+                timer.cancel()
+            if p in _pending:
+                jobs.append((p, _pending[p]))
+    for p, job in jobs:
+        _write_now(p, *job)
+        # Readers keep seeing the payload until it is on disk; a newer write stays pending
+        with _lock:
+            if _pending.get(p) is job:
+                del _pending[p]
+
+
+atexit.register(flush)
+
+
+def exists(path):
+    with _lock:
+        if path in _pending:
+            return True
+    return os.path.exists(path)
+
+
+def read_csv(path, **kwargs):
+    """Latest contents of a CSV, including a write that is still pending; None if it does not exist"""
+    with _lock:
+        pending = _pending.get(path)
+    if pending is not None and pending[0] == 'csv':
+        return pending[1].copy()
+    if not os.path.exists(path):
+        return None
+    with metrics.timed('storage.read_csv'):
+        return pd.read_csv(path, **kwargs)
+
+
+def write_csv(path, df, coalesce=True):
+    # Arrow float32 columns go through numpy so the file reads 187.34, not 187.33999633789062
+    float32 = {c: 'float32' for c, dtype in df.dtypes.items() if dtype == 'float32[pyarrow]'}
+    _schedule(path, 'csv', df.astype(float32) if float32 else df.copy(), coalesce)
+
+
+def read_text(path):
+    with _lock:
+        pending = _pending.get(path)
+    if pending is not None and pending[0] == 'text':
+        return pending[1]
+    if not os.path.exists(path):
+        return None
+    with metrics.timed('storage.read_text'), open(path, 'r') as f:
+        return f.read()
+
+
+def write_text(path, text, coalesce=True):
+    _schedule(path, 'text', text, coalesce)
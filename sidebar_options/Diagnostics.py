@@ -0,0 +1,52 @@
+import streamlit as st
+from features import metrics
+from features.frames import session_memory
+
+
+def show():
+    st.title("🩺 Diagnostics")
+    st.caption("Timings and call counts for this server process since it started or was last reset. "
+               "Percentiles are bucket upper bounds from the latency histograms.")
+
+    timings = metrics.timings_frame()
+    if timings.empty:
+        st.info("No operations recorded yet. Use the other pages, then come back here.")
+    else:
+        pages = ["All"] + sorted(timings['Page'].unique())
+        selected_page = st.selectbox("Filter by page", pages)
+        if selected_page != "All":
+            timings = timings[timings['Page'] == selected_page]
+
+        st.subheader("Where the time goes")
+        by_operation = timings.groupby('Operation')['Total (s)'].sum().sort_values(ascending=False)
+        st.bar_chart(by_operation)
+
+        st.subheader("Operations")
+        st.dataframe(timings, hide_index=True, column_config={
+            'Total (s)': st.column_config.NumberColumn(format="%.3f"),
+            'Mean (ms)': st.column_config.NumberColumn(format="%.1f"),
+            'p50 (ms) ≤': st.column_config.NumberColumn(format="%.0f"),
+            'p95 (ms) ≤': st.column_config.NumberColumn(format="%.0f"),
+            'Max (ms)': st.column_config.NumberColumn(format="%.1f"),
+        })
+
+    counters = metrics.counters_frame()
+    if not counters.empty:
+        st.subheader("Counters")
+        st.dataframe(counters, hide_index=True)
+
+    memory = session_memory(st.session_state)
+    if not memory.empty:
+        st.subheader("This session's frames")
+        st.caption(f"{memory['Bytes'].sum() / 1024:,.1f} KiB held in session state, measured with "
+                   "memory_usage(deep=True).")
+        st.dataframe(memory, hide_index=True)
+
+    text = metrics.prometheus_text()
+    with st.expander("Prometheus export"):
+        st.code(text, language="text")
+        st.download_button("Download metrics.prom", text, file_name="metrics.prom", mime="text/plain")
+
+    if st.button("Reset counters"):
+        metrics.reset()
+        st.rerun()
@@ -1,10 +1,16 @@
 import streamlit as st
+import plotly.express as px
 from features.risk_analysis import *
-from groq import Groq
-import os
-from dotenv import load_dotenv
-load_dotenv()
-API_KEY = os.getenv('API_KEY')
+from features.ledger import positions_as_of
+from features import metrics
+from features.ai_stream import render_ai_response
+from features.llm_cache import cache_stats
+from features.rolling_risk import ROLLING_METRICS, update_rolling_metrics, read_rolling_metrics
+from features.clients import get_groq_client
+from features.monte_carlo import MC_PATHS, monte_carlo_from_moments
+from features.covariance import (
+    COVARIANCE_WINDOWS, ESTIMATORS, get_moments, correlation_from_covariance, betas_from_covariance
+)
 
 def show():
     try:
@@ -32,6 +38,15 @@ def show():
 
             st.line_chart(stock)
 
+            st.subheader("📉 Rolling Risk")
+            update_rolling_metrics(ticker)
+            metric = st.selectbox('Rolling metric', ROLLING_METRICS, format_func=str.title)
+            rolling = read_rolling_metrics(ticker, metric)
+            if rolling.empty:
+                st.info("Not enough price history for rolling metrics yet.")
+            else:
+                st.line_chart(rolling)
+
             vol_val = vol.item()
             beta_val = beta.item()
             mdd_val = mdd.item()
@@ -50,11 +65,7 @@ def show():
             """
 
 
-            if 'ai_client' not in st.session_state:
-                st.session_state.ai_client = Groq(api_key=API_KEY)
-
             st.title('🤖 AI Analysis')
-            client = st.session_state.ai_client
             system_prompt = {
                 "role": "system",
                 "content": "You are a professional quantitative finance expert specializing in stock risk analysis. "
@@ -73,15 +84,102 @@ def show():
             ]
 
             try:
-                response = client.chat.completions.create(
+                st.markdown("**AI Response:**")
+                render_ai_response(
+                    get_groq_client,
                     model="llama3-8b-8192",
                     messages=messages,
                     temperature=0.1,
                     max_tokens=700
                 )
-                answer = response.choices[0].message.content.strip()
-                st.markdown(f"**AI Response:** {answer}")
+                stats = cache_stats()
+                st.caption(f"AI cache: {stats['hits']} hits / {stats['misses']} misses")
             except Exception as e:
                 st.error(f"AI request failed: {e}")
+
+        show_portfolio_risk()
     except IndexError:
         st.error('Error: Index Error')
+
+
+def load_portfolio_df():
+    if 'portfolio_df' in st.session_state:
+        return st.session_state.portfolio_df
+    positions = positions_as_of()
+    positions = positions[positions.abs() > 1e-9]
+    return pd.DataFrame({'Ticker': positions.index, 'Shares': positions.values})
+
+
+def load_portfolio_tickers():
+    df = load_portfolio_df()
+    if df is None:
+        return []
+    return df['Ticker'].dropna().tolist()
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def cached_monte_carlo(mean, cov, values, paths):
+    return monte_carlo_from_moments(mean, cov, values, paths=paths)
+
+
+def show_portfolio_risk():
+    st.title("📋 Portfolio Risk")
+    tickers = load_portfolio_tickers()
+    if not tickers:
+        st.info("Add some stocks in the Portfolio Manager to see portfolio-wide risk.")
+        return
+
+    prices, market = download_prices(tickers)
+    risk_table = calculate_risk_table(prices, market)
+    st.dataframe(
+        risk_table.style.format({
+            'Volatility': '{:.2%}',
+            'Beta': '{:.2f}',
+            'Max Drawdown': '{:.2%}',
+            'Sharpe Ratio': '{:.2f}',
+            'VaR (95%)': '{:.2%}'
+        }, na_rep='N/A'),
+        use_container_width=True
+    )
+
+    shares = load_portfolio_df().groupby('Ticker')['Shares'].sum().astype(float)
+    values = (shares * prices.ffill().iloc[-1].reindex(shares.index)).dropna()
+    values = values[values > 0]
+    if values.empty:
+        st.info("Not enough price history to estimate correlations for the portfolio.")
+        return
+
+    st.subheader("🔗 Correlation")
+    col1, col2 = st.columns(2)
+    window_label = col1.selectbox("Window", list(COVARIANCE_WINDOWS), index=len(COVARIANCE_WINDOWS) - 1)
+    estimator = col2.selectbox("Estimator", list(ESTIMATORS), format_func=ESTIMATORS.get)
+
+    # One shared matrix serves the heatmap, the betas and the Monte Carlo simulation
+    benchmark = market.name
+    try:
+        mean, cov, info = get_moments(list(values.index) + [benchmark], COVARIANCE_WINDOWS[window_label], estimator)
+    except ValueError as e:
+        st.info(str(e))
+        return
+    corr = correlation_from_covariance(cov)
+    fig = px.imshow(corr, zmin=-1, zmax=1, color_continuous_scale='RdBu_r', aspect='auto',
+                    text_auto='.2f' if len(corr) <= 15 else False)
+    with metrics.timed('render.plotly_chart'):
+        st.plotly_chart(fig)
+    st.caption(f"{info['observations']} daily log returns through {info['end']:%Y-%m-%d}; "
+               f"shrinkage intensity {info['shrinkage']:.2f}.")
+    with st.expander(f"Betas vs {benchmark} from this matrix"):
+        st.dataframe(betas_from_covariance(cov, benchmark).to_frame().style.format('{:.2f}'))
+
+    st.subheader("🎲 Monte Carlo VaR / CVaR")
+    paths = st.select_slider("Simulated paths", options=[10_000, 25_000, 50_000, 100_000], value=MC_PATHS)
+    with st.spinner("Simulating correlated portfolio returns..."):
+        tail = cached_monte_carlo(mean, cov, values, paths)
+    st.dataframe(tail.style.format('{:.2%}'), use_container_width=True)
+
+    total = values.sum()
+    st.caption(
+        f"Returns over each horizon in trading days for the current ${total:,.0f} of holdings, "
+        f"simulated from the {window_label} {ESTIMATORS[estimator].lower()} covariance above. 1-day 95% VaR is "
+        f"about ${-tail.loc[1, 'VaR (95%)'] * total:,.0f}; CVaR is the average loss beyond the VaR."
+    )
@@ -1,18 +1,40 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-import yfinance as yf
-import requests
-import os
-from dotenv import load_dotenv
-from groq import Groq
-import re
-
-load_dotenv()
-API_KEY = os.getenv("FIN_API_KEY")
-groq_key = os.getenv("API_KEY")
-
-groq_client = Groq(api_key=groq_key)
+from features.price_store import load_history
+from features.quotes import fetch_info
+from features.news import NEWS_PAGE_SIZE, get_company_news
+from features.ai_stream import render_ai_response
+from features.llm_cache import cache_stats
+from features.clients import get_groq_client
+from features.frames import PRICE_HISTORY_DTYPES, compact
+
+METRIC_FIELDS = {
+    'Current Price': 'regularMarketPrice',
+    'Previous Close': 'previousClose',
+    'Open': 'open',
+    'Days Low': 'dayLow',
+    'Days High': 'dayHigh',
+    'Fifty Two Week Low': 'fiftyTwoWeekLow',
+    'Fifty Two Week High': 'fiftyTwoWeekHigh',
+    'Volume': 'volume',
+    'Average Volume': 'averageVolume',
+    'Market Cap': 'marketCap',
+    'Beta': 'beta',
+    'PE Ratio': 'trailingPE',
+    'EPS': 'trailingEps',
+    'Target Price': 'targetMeanPrice',
+}
+
+
+def research_metrics(info):
+    """Key metrics from a yfinance info dict as floats; missing or non-numeric values become NaN"""
+    raw = pd.Series({label: info.get(field) for label, field in METRIC_FIELDS.items()}, dtype=object)
+    return pd.to_numeric(raw, errors='coerce').astype(float)
+
+
+def format_metric(value):
+    return 'N/A' if pd.isna(value) else f"{value:,.2f}"
 
 
 def show():
@@ -34,44 +56,16 @@ def show():
         
         st.session_state['ticker'] = ticker
 
-        yf_ticker = yf.Ticker(ticker)
-        hist = yf_ticker.history(period="7d")
+        hist = load_history([ticker], datetime.today() - timedelta(days=7))[ticker].dropna()
         if hist.empty:
             st.error(f'Could not fetch price data for "{ticker}"')
             st.stop()
         else:
-            st.session_state.ticker_prices_df = hist[['Close']].copy()
+            st.session_state.ticker_prices_df = compact(hist.to_frame('Close'), PRICE_HISTORY_DTYPES)
 
             
-            info = yf_ticker.info
-            metrics = {
-                'Current Price': info.get('regularMarketPrice'),
-                'Previous Close': info.get('previousClose'),
-                'Open': info.get('open'),
-                'Days Low': info.get('dayLow'),
-                'Days High': info.get('dayHigh'),
-                'Fifty Two Week Low': info.get('fiftyTwoWeekLow'),
-                'Fifty Two Week High': info.get('fiftyTwoWeekHigh'),
-                'Volume': info.get('volume'),
-                'Average Volume': info.get('averageVolume'),
-                'Market Cap': info.get('marketCap'),
-                'Beta': info.get('beta'),
-                'PE Ratio': info.get('trailingPE'),
-                'EPS': info.get('trailingEps'),
-                'Target Price': info.get('targetMeanPrice'),
-            }
-
-            def format_value(val):
-                if val is None:
-                    return 'N/A'
-                if isinstance(val, (int, float)):
-                    return f"{val:,.2f}"
-                if isinstance(val, datetime):
-                    return val.strftime('%b %d, %Y')
-                return str(val)
-
-            metrics_formatted = {k: format_value(v) for k, v in metrics.items()}
-            st.session_state.metrics_df = pd.DataFrame([metrics_formatted])
+            # Raw numbers are kept in the session; they are formatted when rendered
+            st.session_state.metrics_df = research_metrics(fetch_info(ticker)).to_frame().T
 
     
     if 'ticker' in st.session_state:
@@ -89,12 +83,11 @@ def show():
         start_date = datetime.today() - timedelta(days=days)
 
         
-        ticker_prices = yf.download(st.session_state['ticker'], start=start_date, auto_adjust=True)['Close'].fillna(
-            method='ffill')
+        ticker_prices = load_history([st.session_state['ticker']], start_date)[st.session_state['ticker']].ffill()
 
         
-        st.session_state.ticker_prices_df = pd.DataFrame(
-            {'Date': ticker_prices.index.ravel(), 'Close': ticker_prices.values.ravel()})
+        st.session_state.ticker_prices_df = compact(pd.DataFrame(
+            {'Date': ticker_prices.index.ravel(), 'Close': ticker_prices.values.ravel()}), PRICE_HISTORY_DTYPES)
 
         
         if not st.session_state.ticker_prices_df.empty:
@@ -109,7 +102,7 @@ def show():
             formatted_lines = []
             for key, value in metrics_dict.items():
                 
-                formatted_lines.append(f"**{key}** {'.' * 20} <span style='color: #00cc44;'>{value}</span>")
+                formatted_lines.append(f"**{key}** {'.' * 20} <span style='color: #00cc44;'>{format_metric(value)}</span>")
 
             
             st.markdown('<br>'.join(formatted_lines), unsafe_allow_html=True)
@@ -126,6 +119,7 @@ def show():
         with col1:
             if st.button(f'{stored_ticker} News'):
                 st.session_state.show_news = True
+                st.session_state.news_shown = NEWS_PAGE_SIZE
                 st.session_state.show_ai = False
 
         with col2:
@@ -138,28 +132,24 @@ def show():
                 if stored_ticker == '':
                     st.warning('Please enter a ticker symbol')
                 else:
-                    two_months_ago = (datetime.now() - timedelta(days=60)).strftime('%Y-%m-%d')
-                    today = datetime.now().strftime('%Y-%m-%d')
-                    url = f"https://finnhub.io/api/v1/company-news?symbol={stored_ticker}&from={two_months_ago}&to={today}&token={API_KEY}"
-                    response = requests.get(url)
-                    news_data = response.json()
-                    if response.status_code == 200:
-                        with st.container():
-                            for article in news_data:
-                                st.markdown(f"### [{article['headline']}]({article['url']})")
-                                col1, col2, col3 = st.columns(3)
-                                with col1:
-                                    readable_date = datetime.fromtimestamp(article['datetime']).strftime(
-                                        '%B %d, %Y at %I:%M %p')
-                                    st.caption(f"📅 {readable_date}")
-                                with col2:
-                                    st.caption(f"📰 {article['source']}")
-                                with col3:
-                                    st.caption(f"📊 Sentiment: {article.get('sentiment', 'N/A')}")
-
-                                # Summary/content
-                                st.markdown(article['summary'])
-                                st.divider()
+                    news_data = get_company_news(stored_ticker, days=60)
+                    shown = st.session_state.get('news_shown', NEWS_PAGE_SIZE)
+                    with st.container():
+                        for article in news_data[:shown]:
+                            st.markdown(f"### [{article['headline']}]({article['url']})")
+                            readable_date = datetime.fromtimestamp(article['datetime']).strftime(
+                                '%B %d, %Y at %I:%M %p')
+                            st.caption(f"📅 {readable_date} · 📰 {article['source']} · "
+                                       f"📊 Sentiment: {article.get('sentiment', 'N/A')}")
+
+                            # Summary/content
+                            st.markdown(article['summary'])
+                            st.divider()
+
+                    if shown < len(news_data):
+                        if st.button(f'Load more ({len(news_data) - shown} remaining)'):
+                            st.session_state.news_shown = shown + NEWS_PAGE_SIZE
+                            st.rerun()
             except Exception as e:
                 st.error(e)
 
@@ -168,36 +158,7 @@ def show():
                 if stored_ticker == '':
                     st.warning('Please enter a ticker symbol')
                 else:
-                    yf_ticker = yf.Ticker(stored_ticker)
-                    info = yf_ticker.info
-                    metrics = {
-                        'Current Price': info.get('regularMarketPrice'),
-                        'Previous Close': info.get('previousClose'),
-                        'Open': info.get('open'),
-                        'Days Low': info.get('dayLow'),
-                        'Days High': info.get('dayHigh'),
-                        'Fifty Two Week Low': info.get('fiftyTwoWeekLow'),
-                        'Fifty Two Week High': info.get('fiftyTwoWeekHigh'),
-                        'Volume': info.get('volume'),
-                        'Average Volume': info.get('averageVolume'),
-                        'Market Cap': info.get('marketCap'),
-                        'Beta': info.get('beta'),
-                        'PE Ratio': info.get('trailingPE'),
-                        'EPS': info.get('trailingEps'),
-                        'Target Price': info.get('targetMeanPrice'),
-                    }
-
-                    def format_value(val):
-                        if val is None:
-                            return 'N/A'
-                        if isinstance(val, (int, float)):
-                            return f"{val:,.2f}"
-                        if isinstance(val, datetime):
-                            return val.strftime('%b %d, %Y')
-                        return str(val)
-
-                    metrics_formatted = {k: format_value(v) for k, v in metrics.items()}
-                    cleaned_metrics = {k: re.sub(r'\s+', ' ', str(v)) for k, v in metrics_formatted.items()}
+                    cleaned_metrics = research_metrics(fetch_info(stored_ticker)).map(format_metric)
 
                     price_data = f"Current: ${cleaned_metrics['Current Price']}, Previous Close: ${cleaned_metrics['Previous Close']}, Open: ${cleaned_metrics['Open']}"
 
@@ -222,8 +183,9 @@ def show():
                     """
 
                     try:
-                        # noinspection PyTypeChecker
-                        response = groq_client.chat.completions.create(
+                        st.subheader('**🤖 AI Analysis**')
+                        render_ai_response(
+                            get_groq_client,
                             model="llama3-8b-8192",
                             messages=[
                                 {"role": "system",
@@ -245,10 +207,9 @@ def show():
                             ],
                             temperature=0.1
                         )
-                        analysis = response.choices[0].message.content.strip()
 
-                        st.subheader('**🤖 AI Analysis**')
-                        st.markdown(analysis)
+                        stats = cache_stats()
+                        st.caption(f"AI cache: {stats['hits']} hits / {stats['misses']} misses")
                     except Exception as e:
                         st.error(f"AI request failed: {e}")
             except Exception as e:
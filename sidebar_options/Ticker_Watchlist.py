@@ -1,122 +1,98 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta, timezone
 import os
-
-WATCHLIST_FILE = 'watchlist.csv'
+from features.lookback import LOOKBACK_DAYS, watchlist_metrics
+from features.price_store import load_history
+from features.quotes import fetch_quotes, peek_quotes
+from features import storage
+from features.frames import WATCHLIST_DTYPES, compact
+
+REFRESH_WORKERS = int(os.getenv('WATCHLIST_REFRESH_WORKERS', '16'))
+REFRESH_TIMEOUT = float(os.getenv('WATCHLIST_REFRESH_TIMEOUT', '10'))
+HISTORY_BUFFER_DAYS = 30
+WATCHLIST_FORMAT = {
+    'Price Now': '{:,.2f}',
+    'Price 1M Ago': '{:,.2f}',
+    'Price 3M Ago': '{:,.2f}',
+    'Price 6M Ago': '{:,.2f}',
+    'Day % Change': '{:.2f}%',
+    '1M % Change': '{:.2f}%',
+    '3M % Change': '{:.2f}%',
+    '6M % Change': '{:.2f}%',
+}
 
 
 def load_watchlist():
-    if os.path.exists(WATCHLIST_FILE):
-        df = pd.read_csv(WATCHLIST_FILE)
-    else:
-        df = pd.DataFrame(columns=[
-            'Ticker', 'Price Now', 'Price 1M Ago', 'Price 3M Ago', 'Price 6M Ago',
-            'Day % Change', '1M % Change', '3M % Change', '6M % Change'
-        ])
-    return df
+    df = storage.read_csv(storage.WATCHLIST_FILE)
+    if df is None:
+        df = pd.DataFrame(columns=list(WATCHLIST_DTYPES))
+    return compact(df, WATCHLIST_DTYPES)
+
 
+def history_start(today):
+    return today - timedelta(days=LOOKBACK_DAYS['6M'] + HISTORY_BUFFER_DAYS)
 
-def refresh_watchlist_data(watchlist_df):
+
+def refresh_watchlist_data(watchlist_df, max_workers=REFRESH_WORKERS, timeout=REFRESH_TIMEOUT):
     """Refresh all data for tickers in the watchlist"""
     if watchlist_df.empty:
         return watchlist_df
 
-    updated_rows = []
-
-    for _, row in watchlist_df.iterrows():
-        ticker = row['Ticker']
-        try:
-            today = datetime.now(timezone.utc)
-            one_month_ago = today - timedelta(days=30)
-            three_months_ago = today - timedelta(days=90)
-            six_months_ago = today - timedelta(days=182)
-            ticker_yf = yf.Ticker(ticker)
-            
-            buffer_days = 30
-            extended_start = six_months_ago - timedelta(days=buffer_days)
-            hist = ticker_yf.history(start=extended_start.strftime('%Y-%m-%d'), end=today.strftime('%Y-%m-%d'))
-
-            def get_price_on_or_before(date):
-                if hist.empty:
-                    return None
-
-                date_str = date.strftime('%Y-%m-%d')
-
-              
-                if date_str in hist.index:
-                    return hist.loc[date_str]['Close']
-
-             
-                hist_dates = pd.to_datetime([d.split()[0] for d in hist.index.astype(str)])
-                target_date = pd.to_datetime(date_str)
-
-              
-                if target_date < hist_dates.min():
-                    first_date = hist_dates.min().strftime('%Y-%m-%d')
-                    return hist.loc[first_date]['Close']
-
-          
-                valid_dates = hist_dates[hist_dates <= target_date]
-                if len(valid_dates) > 0:
-                    closest_date = valid_dates.max().strftime('%Y-%m-%d')
-                    return hist.loc[closest_date]['Close']
-
-                return None
-
-
-            price_1m = get_price_on_or_before(one_month_ago)
-            price_3m = get_price_on_or_before(three_months_ago)
-            price_6m = get_price_on_or_before(six_months_ago)
-            share_price = ticker_yf.info.get('regularMarketPrice')
-            last_close = ticker_yf.info.get('previousClose')
-
-            price_time_list = [price_1m, price_3m, price_6m, share_price, last_close]
-
-            if any(v is None for v in price_time_list):
-                # Keep old data if refresh fails
-                updated_rows.append(row.tolist())
-                continue
-
-            day_change = share_price - last_close
-            month_change = share_price - price_1m
-            threeM_change = share_price - price_3m
-            sixM_change = share_price - price_6m
-
-            day_pct = (day_change / last_close) * 100 if last_close else None
-            month_pct = (month_change / price_1m) * 100 if price_1m else None
-            threeM_pct = (threeM_change / price_3m) * 100 if price_3m else None
-            sixM_pct = (sixM_change / price_6m) * 100 if price_6m else None
-
-            updated_rows.append([
-                ticker, share_price, price_1m, price_3m, price_6m,
-                day_pct, month_pct, threeM_pct, sixM_pct
-            ])
-
-        except Exception as e:
-            st.warning(f'Failed to refresh data for {ticker}: {e}')
-            # Keep old data if refresh fails
-            updated_rows.append(row.tolist())
-
-    # Create new DataFrame with updated data
-    updated_df = pd.DataFrame(updated_rows, columns=watchlist_df.columns)
+    tickers = watchlist_df['Ticker'].tolist()
+    today = datetime.now(timezone.utc)
+    try:
+        closes = load_history(tickers, history_start(today))
+    except Exception as e:
+        st.warning(f'Failed to load price history: {e}')
+        closes = pd.DataFrame()
+    quotes = fetch_quotes(tickers, max_workers=max_workers, timeout=timeout)
+    fresh = watchlist_metrics(tickers, quotes, closes, today)
+
+    price_columns = ['Price Now', 'Price 1M Ago', 'Price 3M Ago', 'Price 6M Ago']
+    complete = (fresh[price_columns].notna().all(axis=1) & fresh['Ticker'].isin(quotes.index)).to_numpy()
+
+    stale = [t for t, ok in zip(tickers, complete) if not ok]
+    if stale:
+        st.warning(f'Could not refresh {", ".join(stale)}; keeping previous data.')
+
+    # Keep old data for any ticker whose refresh failed or timed out
+    updated_df = watchlist_df.reset_index(drop=True).copy()
+    updated_df.loc[complete, fresh.columns] = fresh.loc[complete].to_numpy()
     return updated_df
 
 
+def apply_live_prices(watchlist_df, quotes):
+    """Update Price Now and the % change columns in place, keeping the stored lookback prices"""
+    price = watchlist_df['Ticker'].map(quotes['price'])
+    previous = watchlist_df['Ticker'].map(quotes['previous_close'])
+    found = price.notna() & previous.notna()
+    if not found.any():
+        return
+
+    watchlist_df.loc[found, 'Price Now'] = price[found]
+    watchlist_df.loc[found, 'Day % Change'] = ((price - previous) / previous * 100)[found]
+    for label in ['1M', '3M', '6M']:
+        past = pd.to_numeric(watchlist_df[f'Price {label} Ago'], errors='coerce')
+        watchlist_df.loc[found, f'{label} % Change'] = ((price - past) / past * 100)[found]
+
+
 def show():
     st.title('Watchlist')
 
     if 'watchlist_df' not in st.session_state:
         st.session_state.watchlist_df = load_watchlist()
 
+    # Pick up quotes the background scheduler or another session already fetched
+    apply_live_prices(st.session_state.watchlist_df, peek_quotes(st.session_state.watchlist_df['Ticker'].tolist()))
+
     # Add refresh button
     col1, col2 = st.columns([1, 4])
     with col1:
         if st.button('🔄 Refresh All Data'):
             with st.spinner('Refreshing watchlist data...'):
                 st.session_state.watchlist_df = refresh_watchlist_data(st.session_state.watchlist_df)
-                st.session_state.watchlist_df.to_csv(WATCHLIST_FILE, index=False)
+                storage.write_csv(storage.WATCHLIST_FILE, st.session_state.watchlist_df)
                 st.success('Watchlist data refreshed!')
                 st.rerun()
 
@@ -131,43 +107,11 @@ def show():
             else:
                 try:
                     today = datetime.now(timezone.utc)
-                    one_month_ago = today - timedelta(days=30)
-                    three_months_ago = today - timedelta(days=90)
-                    six_months_ago = today - timedelta(days=182)
-                    ticker_yf = yf.Ticker(ticker)
-                    hist = ticker_yf.history(start=six_months_ago.strftime('%Y-%m-%d'), end=today.strftime('%Y-%m-%d'))
-
-                    def get_price_on_or_before(date):
-                        date_str = date.strftime('%Y-%m-%d')
-                        while date_str not in hist.index and date > hist.index[0]:
-                            date -= timedelta(days=1)
-                            date_str = date.strftime('%Y-%m-%d')
-                        return hist.loc[date_str]['Close'] if date_str in hist.index else None
-
-                    price_1m = get_price_on_or_before(one_month_ago)
-                    price_3m = get_price_on_or_before(three_months_ago)
-                    price_6m = get_price_on_or_before(six_months_ago)
-                    share_price = ticker_yf.info.get('regularMarketPrice')
-                    last_close = ticker_yf.info.get('previousClose')
-
-
-
-
-                    # Calculate changes :D
-                    day_change = (share_price - last_close) if (
-                                share_price is not None and last_close is not None) else None
-                    month_change = (share_price - price_1m) if (
-                                share_price is not None and price_1m is not None) else None
-                    threeM_change = (share_price - price_3m) if (
-                                share_price is not None and price_3m is not None) else None
-                    sixM_change = (share_price - price_6m) if (
-                                share_price is not None and price_6m is not None) else None
-
-                    # more calculations zzzz
-                    day_pct = (day_change / last_close) * 100 if last_close else None
-                    month_pct = (month_change / price_1m) * 100 if price_1m else None
-                    threeM_pct = (threeM_change / price_3m) * 100 if price_3m else None
-                    sixM_pct = (sixM_change / price_6m) * 100 if price_6m else None
+                    closes = load_history([ticker], history_start(today))
+                    quotes = fetch_quotes([ticker])
+                    row = watchlist_metrics([ticker], quotes, closes, today).iloc[0]
+                    share_price, price_1m, price_3m, price_6m = row['Price Now'], row['Price 1M Ago'], row['Price 3M Ago'], row['Price 6M Ago']
+                    day_pct, month_pct, threeM_pct, sixM_pct = row['Day % Change'], row['1M % Change'], row['3M % Change'], row['6M % Change']
 
                     watchlist_df = st.session_state.watchlist_df
 
@@ -181,9 +125,9 @@ def show():
                             ticker, share_price, price_1m, price_3m, price_6m,
                             day_pct, month_pct, threeM_pct, sixM_pct
                         ]], columns=watchlist_df.columns)
-                        watchlist_df = pd.concat([watchlist_df, new_row], ignore_index=True)
+                        watchlist_df = compact(pd.concat([watchlist_df, new_row], ignore_index=True), WATCHLIST_DTYPES)
 
-                    watchlist_df.to_csv(WATCHLIST_FILE, index=False)
+                    storage.write_csv(storage.WATCHLIST_FILE, watchlist_df)
                     st.session_state.watchlist_df = watchlist_df
 
                     st.success(f'{ticker} added/updated in watchlist.')
@@ -203,7 +147,7 @@ def show():
                             st.session_state.watchlist_df['Ticker'] != ticker
                             ]
                         # Save to CSV after removal
-                        st.session_state.watchlist_df.to_csv(WATCHLIST_FILE, index=False)
+                        storage.write_csv(storage.WATCHLIST_FILE, st.session_state.watchlist_df)
                         st.success(f'Removed {ticker} from watchlist')
                         st.rerun()
                     else:
@@ -212,9 +156,7 @@ def show():
                 except Exception as e:
                     st.error(f'Error removing ticker: {e}')
 
-    display_df = st.session_state.watchlist_df.copy()
-    display_df = display_df.fillna('N/A') 
-    st.dataframe(display_df, hide_index=True)
+    st.dataframe(st.session_state.watchlist_df.style.format(WATCHLIST_FORMAT, na_rep='N/A'), hide_index=True)
 
 
 
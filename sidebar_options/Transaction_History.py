@@ -1,41 +1,31 @@
 import streamlit as st
-import pandas as pd
-import os
+from features.ledger import ledger_summary, query_transactions, delete_transactions
 
 def show():
-    TRANSACTIONS_FILE = "transactions.csv"
-
-    # Load transaction data
-    if os.path.exists(TRANSACTIONS_FILE):
-        df = pd.read_csv(TRANSACTIONS_FILE, parse_dates=["Date"])
-    else:
-        df = pd.DataFrame(columns=["Date", "Type", "Ticker", "Shares", "Price Per Share", "Total Value", "Notes"])
+    # Load the date range and filter options from the ledger indexes
+    summary = ledger_summary()
 
     st.title("📜 Transaction History")
 
     try:
-        if not df.empty:
-            min_date = df["Date"].min()
-            max_date = df["Date"].max()
+        if summary is not None:
+            min_date = summary["min_date"]
+            max_date = summary["max_date"]
             start_date, end_date = st.date_input("Filter by date range", [min_date, max_date])
 
 
-            tickers = ["All"] + sorted(df["Ticker"].dropna().unique().tolist())
+            tickers = ["All"] + summary["tickers"]
             selected_ticker = st.selectbox("Filter by ticker", tickers)
 
-            txn_types = ["All"] + sorted(df["Type"].dropna().unique().tolist())
+            txn_types = ["All"] + summary["types"]
             selected_type = st.selectbox("Filter by transaction type", txn_types)
 
-            filtered_df = df[
-                (df["Date"] >= pd.to_datetime(start_date)) &
-                (df["Date"] <= pd.to_datetime(end_date))
-            ]
-
-            if selected_ticker != "All":
-                filtered_df = filtered_df[filtered_df["Ticker"] == selected_ticker]
-
-            if selected_type != "All":
-                filtered_df = filtered_df[filtered_df["Type"] == selected_type]
+            filtered_df = query_transactions(
+                start=start_date,
+                end=end_date,
+                ticker=None if selected_ticker == "All" else selected_ticker,
+                txn_type=None if selected_type == "All" else selected_type
+            )
 
             if not filtered_df.empty:
                 selected_rows = st.multiselect(
@@ -44,8 +34,7 @@ def show():
                     format_func=lambda x: f"{filtered_df.loc[x, 'Date'].date()} | {filtered_df.loc[x, 'Ticker']} | {filtered_df.loc[x, 'Type']}"
                 )
                 if st.button("🗑 Delete Selected Transactions", type="primary"):
-                    df = df.drop(selected_rows)
-                    df.to_csv(TRANSACTIONS_FILE, index=False)
+                    delete_transactions(selected_rows)
                     st.success("Selected transactions deleted.")
                     st.rerun()
 
@@ -0,0 +1,63 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from features import covariance
+
+TICKERS = ['AAA', 'BBB', 'CCC']
+WINDOW = 20
+
+
+@pytest.fixture
+def prices(monkeypatch):
+    """Synthetic closes ending today, served in place of the price store"""
+    dates = pd.date_range(end=pd.Timestamp(datetime.today()).normalize(), periods=120)
+    rng = np.random.default_rng(7)
+    frame = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), len(TICKERS))), axis=0)),
+                         index=dates, columns=TICKERS)
+
+    def load_history(tickers, start, end=None):
+        window = frame.loc[pd.Timestamp(start):]
+        return window if end is None else window.loc[:pd.Timestamp(end)]
+
+    monkeypatch.setattr(covariance, 'load_history', load_history)
+    monkeypatch.setattr(covariance, '_states', covariance.OrderedDict())
+    return frame
+
+
+def full_recompute(prices, end):
+    returns = np.log(prices.loc[:end]).diff().dropna().tail(WINDOW)
+    return returns.mean(), np.cov(returns.to_numpy(), rowvar=False, ddof=1)
+
+
+def test_incremental_state_matches_full_recompute(prices):
+    ends = prices.index[60:-1]
+    for end in ends:
+        mean, cov, info = covariance.get_moments(TICKERS, WINDOW, 'sample', end=end)
+        expected_mean, expected_cov = full_recompute(prices, end)
+        assert info['end'] == end
+        np.testing.assert_allclose(mean.to_numpy(), expected_mean.to_numpy(), atol=1e-12)
+        np.testing.assert_allclose(cov.to_numpy(), expected_cov, atol=1e-12)
+    # Every later call only appended bars to the one cached state
+    assert len(covariance._states) == 1
+
+
+def test_todays_bar_is_left_out(prices):
+    _, _, info = covariance.get_moments(TICKERS, WINDOW, 'sample')
+    assert info['end'] == prices.index[-2]
+
+    # A later close for today must not leave a stale return in the cached window
+    prices.iloc[-1] *= 1.05
+    mean, cov, _ = covariance.get_moments(TICKERS, WINDOW, 'sample')
+    expected_mean, expected_cov = full_recompute(prices, prices.index[-2])
+    np.testing.assert_allclose(mean.to_numpy(), expected_mean.to_numpy(), atol=1e-12)
+    np.testing.assert_allclose(cov.to_numpy(), expected_cov, atol=1e-12)
+
+
+def test_ledoit_wolf_shrinks_towards_scaled_identity(prices):
+    _, sample, _ = covariance.get_moments(TICKERS, WINDOW, 'sample', end=prices.index[-2])
+    _, shrunk, info = covariance.get_moments(TICKERS, WINDOW, 'ledoit_wolf', end=prices.index[-2])
+    emp = sample.to_numpy() * (WINDOW - 1) / WINDOW
+    target = np.trace(emp) / len(TICKERS) * np.eye(len(TICKERS))
+    assert 0 <= info['shrinkage'] <= 1
+    np.testing.assert_allclose(shrunk.to_numpy(), (1 - info['shrinkage']) * emp + info['shrinkage'] * target)
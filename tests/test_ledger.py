@@ -0,0 +1,56 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from features import ledger
+
+
+@pytest.fixture
+def txns(tmp_path, monkeypatch):
+    """A ledger of random buys and sells over 2023, with a snapshot every 20 transactions"""
+    monkeypatch.setattr(ledger, 'LEDGER_DB_FILE', str(tmp_path / 'ledger.db'))
+    monkeypatch.setattr(ledger, 'SNAPSHOT_EVERY', 20)
+    rng = np.random.default_rng(5)
+    dates = pd.date_range('2023-01-02', '2023-12-29', freq='B')
+    for date in sorted(rng.choice(dates, 200)):
+        ledger.append_transaction(pd.Timestamp(date).strftime('%Y-%m-%d'), rng.choice(['Buy', 'Sell']),
+                                  rng.choice(['AAA', 'BBB', 'CCC']), float(rng.integers(1, 10)), 10.0, 0.0)
+    # Each call past SNAPSHOT_EVERY unsnapshotted rows checkpoints a little further
+    for date in dates[::20]:
+        ledger.positions_as_of(date)
+    ledger.positions_as_of()
+
+
+def snapshot_dates():
+    with sqlite3.connect(ledger.LEDGER_DB_FILE) as conn:
+        return [row[0] for row in conn.execute('SELECT as_of_date FROM snapshots ORDER BY as_of_date')]
+
+
+def brute_force(date=None):
+    df = ledger.query_transactions(end=date)
+    shares = df['Shares'].where(df['Type'] != 'Sell', -df['Shares'])
+    positions = shares.groupby(df['Ticker']).sum()
+    return positions[positions.abs() > 1e-9].rename('Shares').rename_axis(None).sort_index()
+
+
+def assert_matches_replay():
+    for date in [*pd.date_range('2023-01-31', '2023-12-31', freq='ME'), None]:
+        pd.testing.assert_series_equal(ledger.positions_as_of(date), brute_force(date), check_names=False)
+
+
+def test_snapshots_match_replay(txns):
+    assert len(snapshot_dates()) > 3
+    assert_matches_replay()
+
+
+def test_back_dated_append_invalidates_later_snapshots(txns):
+    ledger.append_transaction('2023-03-15', 'Buy', 'DDD', 3.0, 10.0, 30.0)
+    assert all(date < '2023-03-15' for date in snapshot_dates())
+    assert_matches_replay()
+
+
+def test_delete_invalidates_later_snapshots(txns):
+    ids = ledger.query_transactions(start='2023-06-01', end='2023-06-30').index
+    ledger.delete_transactions(ids)
+    assert all(date < '2023-06-01' for date in snapshot_dates())
+    assert_matches_replay()
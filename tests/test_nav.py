@@ -0,0 +1,85 @@
+from datetime import datetime
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from features import ledger, nav
+from features.lookback import TRADING_DAY
+
+
+@pytest.fixture
+def closes(tmp_path, monkeypatch):
+    """Empty ledger in a temp file; closes are set per test and served in place of the price store"""
+    monkeypatch.setattr(ledger, 'LEDGER_DB_FILE', str(tmp_path / 'ledger.db'))
+    state = {'frame': pd.DataFrame(dtype=float)}
+
+    def load_history(tickers, start, end=None):
+        window = state['frame'].loc[pd.Timestamp(start):]
+        return window if end is None else window.loc[:pd.Timestamp(end)]
+
+    monkeypatch.setattr(nav, 'load_history', load_history)
+    return state
+
+
+def trade(date, txn_type, ticker, shares, price):
+    ledger.append_transaction(date.strftime('%Y-%m-%d'), txn_type, ticker, shares, price, shares * price)
+
+
+def test_twr_ignores_trades_and_deposits(closes):
+    # Mon 4 - Thu 7 March 2024
+    days = pd.date_range('2024-03-04', periods=4, freq=TRADING_DAY)
+    closes['frame'] = pd.DataFrame({'AAA': [10.0, 11.0, 12.1, 11.0]}, index=days)
+    trade(days[0], 'Buy', 'AAA', 10, 10.0)
+    trade(days[1], 'Buy', 'AAA', 10, 11.0)
+    trade(days[2], 'Sell', 'AAA', 5, 12.1)
+
+    first = nav.compute_nav(None, days[1], 0.0)
+    # 500 of cash is deposited before the third day
+    second = nav.compute_nav(days[1], days[3], 500.0, first.iloc[-1])
+    series = pd.concat([first, second])
+
+    np.testing.assert_allclose(series['NAV'], [100.0, 220.0, 681.5, 665.0])
+    np.testing.assert_allclose(series['Flow'], [100.0, 110.0, 439.5, 0.0])
+    # Stock up 10% on each of the first two days; the deposit is not a gain
+    np.testing.assert_allclose(series['Daily Return'], [0.0, 0.1, 0.1, 665.0 / 681.5 - 1])
+    np.testing.assert_allclose(series['TWR Index'], [1.0, 1.1, 1.21, 1.21 * 665.0 / 681.5])
+
+
+@pytest.fixture
+def history(closes):
+    """Two tickers traded over the last few months, with closes through today"""
+    today = pd.Timestamp(datetime.today()).normalize()
+    days = pd.date_range(end=today, periods=80, freq=TRADING_DAY)
+    rng = np.random.default_rng(11)
+    closes['frame'] = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(days), 2)), axis=0)),
+                                   index=days, columns=['AAA', 'BBB'])
+    for i, (txn_type, ticker, shares) in enumerate([('Buy', 'AAA', 10), ('Buy', 'BBB', 5), ('Sell', 'AAA', 4),
+                                                    ('Buy', 'BBB', 3), ('Sell', 'BBB', 2)]):
+        day = days[5 + i * 12]
+        trade(day, txn_type, ticker, shares, closes['frame'].loc[day, ticker])
+    return days
+
+
+def full_recompute(cash):
+    last_complete = TRADING_DAY.rollback(pd.Timestamp.today().normalize() - pd.Timedelta(days=1))
+    return nav.compute_nav(None, last_complete, cash)
+
+
+def test_incremental_update_matches_full_recompute(history):
+    cash = 1000.0
+    pd.testing.assert_frame_equal(nav.update_nav(cash), full_recompute(cash), check_freq=False)
+
+    # As if the series was last extended a month ago
+    with sqlite3.connect(ledger.LEDGER_DB_FILE) as conn:
+        conn.execute('DELETE FROM nav WHERE date > ?', (history[-20].strftime('%Y-%m-%d'),))
+    pd.testing.assert_frame_equal(nav.update_nav(cash), full_recompute(cash), check_freq=False)
+
+
+def test_back_dated_trade_invalidates_stored_nav(history):
+    cash = 1000.0
+    nav.update_nav(cash)
+    trade(history[20], 'Buy', 'AAA', 7, 50.0)
+    ids = ledger.query_transactions(ticker='BBB').index
+    ledger.delete_transactions(ids[-1:])
+
+    pd.testing.assert_frame_equal(nav.update_nav(cash), full_recompute(cash), check_freq=False)
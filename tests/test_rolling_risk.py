@@ -0,0 +1,62 @@
+from datetime import datetime
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from features import price_store, rolling_risk
+
+WINDOW = 20
+
+
+@pytest.fixture
+def market(tmp_path, monkeypatch):
+    """Synthetic adjusted closes for AAA and SPY, served in place of Yahoo.
+
+    `visible` limits the download to bars up to that date, as if later
+    sessions had not traded yet.
+    """
+    db = str(tmp_path / 'price_history.db')
+    monkeypatch.setattr(price_store, 'PRICE_DB_FILE', db)
+    monkeypatch.setattr(rolling_risk, 'PRICE_DB_FILE', db)
+    # Skip the process-wide market cache so every call reaches the store
+    monkeypatch.setattr(rolling_risk, 'update_history', price_store._update_history_uncached)
+
+    dates = pd.date_range(end=pd.Timestamp(datetime.today()).normalize() - pd.Timedelta(days=1), periods=80)
+    rng = np.random.default_rng(3)
+    closes = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), 2)), axis=0)),
+                          index=dates, columns=['AAA', 'SPY'])
+    state = {'closes': closes, 'visible': dates[-10]}
+
+    def download(tickers, start, end=None):
+        window = state['closes'].loc[pd.Timestamp(start):state['visible']]
+        return {t: window[[t]].rename(columns={t: 'Close'}).reindex(columns=price_store.FIELDS)
+                for t in tickers if t in window}
+
+    monkeypatch.setattr(price_store, '_download', download)
+    return state
+
+
+def latest_volatility():
+    return rolling_risk.read_rolling_metrics('AAA', 'volatility', windows=(WINDOW,)).iloc[-1, 0]
+
+
+def expected_volatility(closes):
+    rolling = rolling_risk.RollingRisk(WINDOW)
+    for price, market_price in zip(closes['AAA'], closes['SPY']):
+        metrics = rolling.update(float(price), float(market_price))
+    return metrics['volatility']
+
+
+def test_split_reseeds_rolling_state(market):
+    rolling_risk.update_rolling_metrics('AAA', windows=(WINDOW,))
+    assert latest_volatility() == pytest.approx(expected_volatility(market['closes'].loc[:market['visible']]))
+
+    # A 10:1 split: Yahoo restates the whole history in the new basis
+    market['closes']['AAA'] /= 10
+    market['visible'] = market['closes'].index[-1]
+    with sqlite3.connect(price_store.PRICE_DB_FILE) as conn:
+        conn.execute("UPDATE coverage SET fetched_at = '2000-01-01 00:00:00'")
+
+    rolling_risk.update_rolling_metrics('AAA', windows=(WINDOW,))
+    assert latest_volatility() == pytest.approx(expected_volatility(market['closes']))
+    assert rolling_risk.read_rolling_metrics('AAA', 'volatility', windows=(WINDOW,)).max().iloc[0] < 1